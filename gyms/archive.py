@@ -0,0 +1,44 @@
+from django.db import transaction
+
+from gyms.models import (Route, Send, Favorite, Rating, RouteFlag, ArchivedRoute,
+    ArchivedSend, ArchivedFavorite, ArchivedRating, ArchivedRouteFlag)
+
+# Activity tables moved along with their routes, and where they go.
+ACTIVITY = (
+    (Send, ArchivedSend),
+    (Favorite, ArchivedFavorite),
+    (Rating, ArchivedRating),
+    (RouteFlag, ArchivedRouteFlag),
+)
+
+# Route bookkeeping that ArchivedRoute doesn't keep.
+LIVE_ONLY_FIELDS = ('open_flags',)
+
+def route_fields(route):
+    return dict((field.attname, getattr(route, field.attname)) for field in Route._meta.concrete_fields
+        if field.attname not in LIVE_ONLY_FIELDS)
+
+@transaction.atomic
+def archive_batch(cutoff, size):
+    """
+    Moves up to size routes torn before cutoff, and their activity, into the
+    archive tables. Returns the number of routes moved.
+    """
+    # The base manager skips RouteManager's rating aggregate.
+    routes = list(Route._base_manager.select_for_update().filter(status="torn", date_torn__lt=cutoff).order_by('date_torn')[:size])
+    if not routes:
+        return 0
+    slugs = [route.slug for route in routes]
+    ArchivedRoute.objects.bulk_create([ArchivedRoute(**route_fields(route)) for route in routes])
+    for model, archive in ACTIVITY:
+        rows = model.objects.filter(route__in=slugs)
+        archive.objects.bulk_create([archive(**row) for row in rows.values()], batch_size=500)
+        rows.delete()
+    Route._base_manager.filter(slug__in=slugs).delete()
+    return len(routes)
+
+def archived_route(gym, slug):
+    try:
+        return gym.archived_routes.get(slug=slug)
+    except ArchivedRoute.DoesNotExist:
+        return None
@@ -0,0 +1,88 @@
+import json
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from rockgympro.cache import cache
+
+from gyms.models import Gym, RouteChange
+from gyms.rows import route_rows
+
+SEQ_KEY = "route_changes:%s"
+
+# Row fields that only make sense on the admin screens or are implied by the change.
+OMITTED_FIELDS = ('slug', 'setter_name', 'flagged', 'url')
+
+def record(gym_id, kind, entries):
+    """
+    Appends (route slug, data) entries to the gym's change log under the next
+    sequence numbers. The gym row is locked while the numbers are taken, so
+    each gym's sequence has no gaps or repeats.
+
+    The shared cache copy of the latest number is only written once the
+    changes have committed. Callers that record inside their own atomic()
+    block call cache_seq after it exits.
+    """
+    if not entries:
+        return None
+    with transaction.atomic():
+        seq = Gym.objects.select_for_update().filter(pk=gym_id).values_list('change_seq', flat=True)[0]
+        RouteChange.objects.bulk_create([
+            RouteChange(gym_id=gym_id, seq=seq + i + 1, route=slug, kind=kind, data=json.dumps(data))
+            for i, (slug, data) in enumerate(entries)
+        ])
+        seq += len(entries)
+        Gym.objects.filter(pk=gym_id).update(change_seq=seq)
+    cache_seq(gym_id, seq)
+    return seq
+
+def route_data(row, route):
+    data = row._asdict()
+    for field in OMITTED_FIELDS:
+        del data[field]
+    # Only routes loaded through RouteManager carry their rating.
+    if not hasattr(route, 'score'):
+        del data['score']
+    return data
+
+def record_routes(kind, routes):
+    by_gym = defaultdict(list)
+    for route in routes:
+        by_gym[route.gym_id].append(route)
+    for gym_id, routes in by_gym.items():
+        rows = route_rows(routes, routes[0].gym, url_name=None)
+        record(gym_id, kind, [(row.slug, route_data(row, route)) for row, route in zip(rows, routes)])
+
+def record_score(route, score):
+    record(route.gym_id, 'score', [(route.slug, dict(score=score))])
+
+def committed_seq(gym_id):
+    """
+    The gym's latest sequence number as committed to the database.
+    """
+    return Gym.objects.filter(pk=gym_id).values_list('change_seq', flat=True)[0]
+
+def cache_seq(gym_id, seq=None):
+    """
+    Stores the gym's committed sequence number in the shared cache for
+    pollers. Does nothing inside a transaction, which may still roll back
+    and leave the cached number ahead of the database.
+    """
+    if connection.in_atomic_block:
+        return
+    if seq is None:
+        seq = committed_seq(gym_id)
+    cache.shared.set(SEQ_KEY % gym_id, seq, None)
+
+def latest_seq(gym_id):
+    """
+    The gym's latest sequence number, normally straight from the shared cache.
+    """
+    seq = cache.shared.get(SEQ_KEY % gym_id)
+    if seq is None:
+        seq = committed_seq(gym_id)
+        cache_seq(gym_id, seq)
+    return seq
+
+def changes_since(gym_id, since, limit=500):
+    return list(RouteChange.objects.filter(gym_id=gym_id, seq__gt=since).order_by('seq')[:limit])
@@ -0,0 +1,55 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from gyms.models import FeedBatch, FeedEntry, GymFollow
+
+# Most feed entries kept per user.
+FEED_LENGTH = 50
+
+@transaction.atomic
+def publish_routes(routes):
+    """
+    Fans newly completed routes out to the followers of their gyms.
+
+    Routes are batched per gym and setting session (date set): each batch is one
+    shared FeedBatch row, and each follower gets a single FeedEntry pointing at
+    it the first time the batch is created.
+    """
+    sessions = defaultdict(list)
+    for route in routes:
+        sessions[(route.gym_id, route.date_set)].append(route.slug)
+    for (gym_id, date_set), slugs in sessions.items():
+        batch, created = FeedBatch.objects.select_for_update().get_or_create(gym_id=gym_id, date_set=date_set)
+        known = set(batch.route_slugs())
+        slugs = [slug for slug in slugs if slug not in known]
+        if not slugs:
+            continue
+        slugs = batch.route_slugs() + slugs
+        batch.routes = ",".join(slugs)
+        batch.route_count = len(slugs)
+        batch.save()
+        if created:
+            fan_out(batch)
+        else:
+            # Move the session back to the top of its followers' feeds.
+            FeedEntry.objects.filter(batch=batch).update(created=timezone.now())
+
+def fan_out(batch):
+    followers = list(GymFollow.objects.filter(gym_id=batch.gym_id).values_list('user', flat=True))
+    FeedEntry.objects.bulk_create([FeedEntry(user_id=user, batch=batch) for user in followers], batch_size=500)
+    trim_feeds(followers)
+
+def trim_feeds(users):
+    """
+    Drops entries beyond FEED_LENGTH for the given users.
+    """
+    full = FeedEntry.objects.filter(user__in=users).values('user').annotate(count=Count('id')).filter(count__gt=FEED_LENGTH)
+    for row in full:
+        keep = FeedEntry.objects.filter(user=row['user']).order_by('-created').values_list('id', flat=True)[:FEED_LENGTH]
+        FeedEntry.objects.filter(user=row['user']).exclude(id__in=list(keep)).delete()
+
+def user_feed(user, limit=FEED_LENGTH):
+    return FeedEntry.objects.filter(user=user).order_by('-created').select_related('batch', 'batch__gym')[:limit]
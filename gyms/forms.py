@@ -11,13 +11,17 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from datetime import *
 
+from rockgympro.cache import cache
+
 class PrintForm(forms.Form):
 
     end = forms.DateField(initial=date.today(),
         widget = forms.DateInput(attrs={'data-date-autoclose':"true", "data-auto-close":'true'}, format="%m/%d/%Y"),)
     start = forms.DateField(initial=date.today()-timedelta(weeks=1),
         widget = forms.DateInput(attrs={'data-date-autoclose':"true", "data-auto-close":'true'}, format="%m/%d/%Y"),)
-  
+    layout = forms.ChoiceField(choices=(("list", "Route list"), ("tags", "Wall tags")), initial="list")
+    qr_codes = forms.BooleanField(required=False, label="Add QR codes linking to the route pages (wall tags only)")
+
 
     def clean_end(self):
         if self.cleaned_data['end'] > date.today():
@@ -29,6 +33,27 @@ class PrintForm(forms.Form):
             raise ValidationError("Start date cannot be after end date.", code="start_after_end")
         return self.cleaned_data['start']
 
+def build_route_form_choices(gym):
+    setters = gym.staff.filter(level__gte=1000)
+    return dict(
+        location=tuple([(x.strip(),x.strip()) for x in gym.location_options.split('\n')]),
+        grade=(
+            ("Top Rope", [(None, "---------")] + rating_scales[gym.top_rope_format]),
+            ("Lead", [(None, "---------")] +  rating_scales[gym.lead_format]),
+            ("Bouldering", [(None, "---------")] + rating_scales[gym.bouldering_format]),
+        ),
+        setter=[("", "---------")] + [(user.pk, unicode(user)) for user in setters],
+    )
+
+def route_form_choices(gym):
+    """
+    The location, grade and setter choices for a gym's RouteForm. They only
+    change when the gym is edited, and staff changes bump Gym.edited too, so
+    they are cached against it.
+    """
+    key = "route_form_choices:%s:%s" % (gym.pk, gym.edited.isoformat())
+    return cache.get_or_set(key, lambda: build_route_form_choices(gym), 60 * 60 * 24)
+
 class RouteForm(ModelForm):
 
     location = forms.ChoiceField()
@@ -36,20 +61,18 @@ class RouteForm(ModelForm):
 
     def __init__(self, gym, user, setter=None, location=None, date_set=None, *args, **kwargs):
         super(RouteForm, self).__init__(*args, **kwargs)
+        choices = route_form_choices(gym)
         self.fields['setter'].queryset = gym.staff.filter(level__gte=1000)
+        self.fields['setter'].choices = choices['setter']
         self.fields['date_set'].initial = date_set or timezone.now()
         self.fields['status'].initial = 'complete'
         self.fields['type'].initial = 'bouldering'
-        self.fields['location'].choices = tuple([(x.strip(),x.strip()) for x in gym.location_options.split('\n')])
+        self.fields['location'].choices = choices['location']
         self.fields['location'].initial = location or self.fields['location'].initial
         self.instance.gym = gym
         self.instance.grade = self.instance.get_grade()
         self.fields['setter'].initial = setter if setter != False else user
-        self.fields['grade'].choices = (
-            ("Top Rope", [(None, "---------")] + rating_scales[gym.top_rope_format]),
-            ("Lead", [(None, "---------")] +  rating_scales[gym.lead_format]),
-            ("Bouldering", [(None, "---------")] + rating_scales[gym.bouldering_format]),
-        )
+        self.fields['grade'].choices = choices['grade']
         self.initial['grade'] = self.instance.get_grade()
         if gym.tape_colors < 2:
             del self.fields['color2']
@@ -69,6 +92,73 @@ class RouteForm(ModelForm):
         'type': forms.RadioSelect(),
         }
 
+class BulkRouteForm(RouteForm):
+    """
+    One row of the bulk add screen. Rows without a grade are left out.
+    """
+
+    def has_changed(self):
+        return self.data.get(self.add_prefix('grade')) not in (None, "", "None")
+
+    class Meta(RouteForm.Meta):
+        fields = ['type', 'grade', 'location', 'date_set', 'setter', 'name', 'status', 'color1', 'color2', 'color3']
+        widgets = dict(RouteForm.Meta.widgets,
+            date_set=forms.DateInput(attrs={'class':"route-date-set", 'data-date-autoclose':"true", "data-auto-close":'true'}, format="%m/%d/%Y"),
+            type=forms.Select(),
+        )
+
+class BaseBulkRouteFormSet(forms.BaseFormSet):
+    """
+    A setting session's worth of new routes. Rows without a grade are
+    ignored; the rest are validated together before any is saved.
+    """
+
+    def __init__(self, gym, user, rows=10, *args, **kwargs):
+        self.gym = gym
+        self.user = user
+        self.extra = rows
+        super(BaseBulkRouteFormSet, self).__init__(*args, **kwargs)
+
+    def _construct_form(self, i, **kwargs):
+        kwargs.update(self.form_defaults())
+        return super(BaseBulkRouteFormSet, self)._construct_form(i, **kwargs)
+
+    def form_defaults(self):
+        return dict(gym=self.gym, user=self.user, setter=False, date_set=date.today())
+
+    def filled_forms(self):
+        return [form for form in self.forms if form.has_changed()]
+
+    def clean(self):
+        if any(self.errors):
+            return
+        if not self.filled_forms():
+            raise forms.ValidationError("Enter at least one route.", code="no_routes")
+        seen = set()
+        for form in self.filled_forms():
+            data = form.cleaned_data
+            key = (data['location'], data['type'], data['grade'], data.get('name'),
+                data.get('color1'), data.get('color2'), data.get('color3'))
+            if key in seen:
+                raise forms.ValidationError("Two routes have the same location, grade and colors.", code="duplicate_route")
+            seen.add(key)
+
+    def routes(self):
+        return [form.save(commit=False) for form in self.filled_forms()]
+
+class ResetLocationForm(forms.Form):
+    """
+    Optionally tears a location's live routes as the bulk routes replace them.
+    """
+
+    location = forms.ChoiceField(required=False, label="Reset location")
+
+    def __init__(self, gym, *args, **kwargs):
+        super(ResetLocationForm, self).__init__(*args, **kwargs)
+        self.fields['location'].choices = (("", "Don't tear anything"),) + route_form_choices(gym)['location']
+
+BulkRouteFormSet = forms.formset_factory(BulkRouteForm, formset=BaseBulkRouteFormSet, extra=0, max_num=100, validate_max=True)
+
 class GymSettingsForm(ModelForm):
 
     class Meta:
@@ -0,0 +1,92 @@
+import datetime
+from collections import defaultdict
+from itertools import chain
+
+from django.db import transaction
+from django.utils import timezone
+
+from gyms.models import ArchivedSend, LeaderboardEntry, Send
+
+PERIODS = [period for period, name in LeaderboardEntry.PERIOD_CHOICES]
+
+ALL_TIME = datetime.date(1970, 1, 1)
+
+def bucket_start(period, day):
+    if period == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    elif period == 'month':
+        return day.replace(day=1)
+    return ALL_TIME
+
+def local_date(value):
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+def entry_key(send, period):
+    return dict(gym_id=send.route.gym_id, user_id=send.user_id, type=send.route.type,
+        period=period, bucket=bucket_start(period, local_date(send.created)))
+
+@transaction.atomic
+def add_send(send):
+    """
+    Counts a newly saved Send in each of its leaderboard buckets.
+    """
+    for period in PERIODS:
+        entry, created = LeaderboardEntry.objects.select_for_update().get_or_create(**entry_key(send, period))
+        entry.sends += 1
+        if entry.hardest is None or send.route.grade > entry.hardest:
+            entry.hardest = send.route.grade
+        entry.save()
+
+def send_rows(**filters):
+    """
+    (user, type, grade, created) for live and archived sends matching filters.
+    """
+    fields = ('user', 'route__type', 'route__grade', 'created')
+    return chain(Send.objects.filter(**filters).values_list(*fields),
+        ArchivedSend.objects.filter(**filters).values_list(*fields))
+
+def bucket_totals(sends):
+    """
+    Sends and hardest grade per (user, type, period, bucket) from send_rows.
+    """
+    totals = defaultdict(lambda: dict(sends=0, hardest=None))
+    for user, type, grade, created in sends:
+        day = local_date(created)
+        for period in PERIODS:
+            entry = totals[(user, type, period, bucket_start(period, day))]
+            entry['sends'] += 1
+            if entry['hardest'] is None or grade > entry['hardest']:
+                entry['hardest'] = grade
+    return totals
+
+@transaction.atomic
+def remove_send(send):
+    """
+    Recounts the buckets of a deleted Send from the climber's remaining live
+    and archived sends.
+    """
+    gym_id, type = send.route.gym_id, send.route.type
+    totals = bucket_totals(send_rows(user=send.user_id, route__gym=gym_id, route__type=type))
+    for period in PERIODS:
+        key = entry_key(send, period)
+        entry = totals.get((send.user_id, type, period, key['bucket']))
+        if entry:
+            LeaderboardEntry.objects.filter(**key).update(**entry)
+        else:
+            LeaderboardEntry.objects.filter(**key).delete()
+
+@transaction.atomic
+def rebuild(gym):
+    """
+    Recomputes every leaderboard bucket at gym from one pass over its sends.
+    """
+    totals = bucket_totals(send_rows(route__gym=gym))
+    LeaderboardEntry.objects.filter(gym=gym).delete()
+    LeaderboardEntry.objects.bulk_create([LeaderboardEntry(gym=gym, user_id=user, type=type, period=period, bucket=bucket, **entry)
+        for (user, type, period, bucket), entry in totals.items()], batch_size=500)
+    return len(totals)
+
+def leaderboard(gym, type, period, order='-sends', limit=50):
+    bucket = bucket_start(period, timezone.localtime(timezone.now()).date())
+    return LeaderboardEntry.objects.filter(gym=gym, type=type, period=period, bucket=bucket) \
+        .order_by(order).select_related('user')[:limit]
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from rockgympro.cache import SharedCounters, cache
+
+from gyms.models import Gym
+
+class GymCache(object):
+    """
+    Process-local cache of gyms by slug.
+
+    Entries are dropped whenever the shared "gyms_version" counter moves,
+    which Gym.save and Gym.delete bump. Workers check the counter at most
+    every check_interval seconds, so another worker's edit shows up within
+    that window. Each lookup returns a fresh Gym built from the cached field
+    values, so per-request state set on an instance never leaks between
+    requests.
+    """
+    VERSION_KEY = "gyms_version"
+
+    def __init__(self, check_interval=2):
+        self.check_interval = check_interval
+        self._gyms = {}
+        self._version = None
+        self._checked = 0
+        self._lock = threading.Lock()
+        self.counters = SharedCounters("gym_cache", ('hits', 'misses', 'invalidations'), cache.alias)
+
+    def count(self, name):
+        self.counters.count(name)
+
+    def hit_rate(self, stats):
+        lookups = stats['hits'] + stats['misses']
+        return round(stats['hits'] * 1.0 / lookups, 3) if lookups else None
+
+    def stats(self):
+        """
+        This process's counters.
+        """
+        stats = dict(self.counters.local)
+        stats['hit_rate'] = self.hit_rate(stats)
+        stats['entries'] = len(self._gyms)
+        return stats
+
+    def shared_stats(self):
+        """
+        Counters summed across every worker, as of their last flush.
+        """
+        stats = self.counters.totals()
+        stats['hit_rate'] = self.hit_rate(stats)
+        return stats
+
+    def version(self):
+        now = time.time()
+        if now - self._checked >= self.check_interval:
+            version = cache.shared.get(self.VERSION_KEY) or 0
+            with self._lock:
+                if version != self._version:
+                    if self._version is not None:
+                        self.count('invalidations')
+                    self._gyms = {}
+                    self._version = version
+                self._checked = now
+        return self._version
+
+    def changed(self):
+        try:
+            cache.shared.incr(self.VERSION_KEY)
+        except ValueError:
+            cache.shared.set(self.VERSION_KEY, 1, None)
+        # Drop this worker's copies now rather than after the next check.
+        with self._lock:
+            self._gyms = {}
+            self._checked = 0
+
+    def get(self, slug):
+        """
+        Returns the Gym with slug, raising Gym.DoesNotExist like Gym.objects.get.
+        """
+        version = self.version()
+        values = self._gyms.get(slug)
+        if values is not None:
+            self.count('hits')
+            gym = Gym(**values)
+            gym._state.adding = False
+            return gym
+        self.count('misses')
+        gym = Gym.objects.get(slug=slug)
+        with self._lock:
+            if version == self._version:
+                self._gyms[slug] = dict((field.attname, getattr(gym, field.attname)) for field in Gym._meta.concrete_fields)
+        return gym
+
+gym_cache = GymCache()
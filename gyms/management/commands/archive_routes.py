@@ -0,0 +1,29 @@
+import datetime
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gyms.archive import archive_batch
+
+class Command(BaseCommand):
+    help = "Moves long-torn routes and their sends, favorites, ratings and flags into the archive tables."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--days', dest='days', type='int', default=None,
+            help="Archive routes torn more than this many days ago. Defaults to ROUTE_ARCHIVE_AFTER_DAYS."),
+        make_option('--batch-size', dest='batch_size', type='int', default=200,
+            help="Routes moved per transaction."),
+    )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.ROUTE_ARCHIVE_AFTER_DAYS
+        cutoff = datetime.date.today() - datetime.timedelta(days=days)
+        total = 0
+        while True:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            self.stdout.write("Archived %s routes" % total)
+        self.stdout.write("Done: %s routes torn before %s archived" % (total, cutoff))
@@ -0,0 +1,28 @@
+import datetime
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from gyms.management.commands.snapshot_grades import Command as SnapshotCommand, parse_date
+from gyms.snapshots import first_route_day, write_snapshots
+
+class Command(SnapshotCommand):
+    help = "Rebuilds grade snapshots for a range of past days from route set and torn dates."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--start', dest='start', help="First day to rebuild (YYYY-MM-DD). Defaults to each gym's first route."),
+        make_option('--end', dest='end', help="Last day to rebuild (YYYY-MM-DD). Defaults to today."),
+        make_option('--gym', dest='gym', help="Only backfill the gym with this slug."),
+    )
+
+    def handle(self, *args, **options):
+        end = parse_date(options['end']) if options.get('end') else datetime.date.today()
+        for gym in self.gyms(options):
+            if options.get('start'):
+                start = parse_date(options['start'])
+            else:
+                start = first_route_day(gym)
+                if start is None:
+                    continue
+            rows = write_snapshots(gym, start, end)
+            self.stdout.write("%s: %s rows from %s to %s" % (gym.slug, rows, start, end))
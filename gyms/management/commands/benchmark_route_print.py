@@ -0,0 +1,56 @@
+import time
+from io import BytesIO
+from itertools import cycle, islice
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gyms.models import Gym
+from gyms.rows import route_rows
+
+class Command(BaseCommand):
+    help = "Times the reportlab route list and wall tags against the xhtml2pdf route list for one gym's routes."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--gym', dest='gym', help="Slug of the gym whose live routes are printed."),
+        make_option('--routes', dest='routes', type='int', default=500,
+            help="Routes per document, repeating the gym's routes as needed."),
+        make_option('--runs', dest='runs', type='int', default=3, help="Documents rendered per renderer."),
+    )
+
+    def time(self, name, render, runs):
+        times = []
+        for i in range(runs):
+            started = time.time()
+            size = len(render())
+            times.append((time.time() - started) * 1000)
+        times.sort()
+        self.stdout.write("%-12s min %.0fms, median %.0fms, max %.0fms, %s bytes" % (
+            name, times[0], times[len(times) // 2], times[-1], size))
+
+    def handle(self, *args, **options):
+        try:
+            gym = Gym.objects.get(slug=options['gym'])
+        except Gym.DoesNotExist:
+            raise CommandError("No gym with slug %r" % options['gym'])
+        live = list(gym.routes.filter(status="complete").select_related('setter'))
+        if not live:
+            raise CommandError("%s has no live routes" % gym.slug)
+        routes = list(islice(cycle(live), options['routes']))
+
+        from easy_pdf.rendering import render_to_pdf
+        from gyms import printing
+
+        def render_with(draw, *args):
+            def render():
+                out = BytesIO()
+                draw(out, gym, routes, *args)
+                return out.getvalue()
+            return render
+
+        self.stdout.write("%s routes, %s runs each" % (len(routes), options['runs']))
+        self.time("xhtml2pdf", lambda: render_to_pdf("routes_list_print.html",
+            {"routes": route_rows(routes, gym, None), "gym": gym}), options['runs'])
+        self.time("reportlab", render_with(printing.route_list_pdf), options['runs'])
+        self.time("tags", render_with(printing.wall_tags_pdf), options['runs'])
+        self.time("tags + qr", render_with(printing.wall_tags_pdf, lambda slug: "http://dynoroute.com/%s/routes/%s/" % (gym.slug, slug)), options['runs'])
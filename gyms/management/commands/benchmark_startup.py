@@ -0,0 +1,22 @@
+import datetime
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from gyms.management.commands.profile_imports import profile_startup
+
+class Command(BaseCommand):
+    help = "Times cold starts of the WSGI application, optionally appending the results to a CSV file."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--runs', dest='runs', type='int', default=5, help="Number of fresh processes to time."),
+        make_option('--record', dest='record', help="CSV file to append date, runs, min, median and max (ms) to."),
+    )
+
+    def handle(self, *args, **options):
+        times = sorted(profile_startup()['total'] * 1000 for i in range(options['runs']))
+        median = times[len(times) // 2]
+        self.stdout.write("%s runs: min %.0fms, median %.0fms, max %.0fms" % (len(times), times[0], median, times[-1]))
+        if options.get('record'):
+            with open(options['record'], "a") as f:
+                f.write("%s,%s,%.1f,%.1f,%.1f\n" % (datetime.datetime.now().isoformat(), len(times), times[0], median, times[-1]))
@@ -0,0 +1,98 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+from gyms.models import Gym, Send, Favorite, Rating, SimilarRoute, RecommendedRoute
+
+# How much each kind of interaction says about a climber liking a route.
+SEND_WEIGHT = 1.0
+FAVORITE_WEIGHT = 2.0
+RATING_WEIGHT = 0.4  # per star
+
+def top_n(scores, n):
+    """
+    (index, score) pairs of the n highest positive scores.
+    """
+    return [(i, float(scores[i])) for i in scores.argsort()[::-1][:n] if scores[i] > 0]
+
+class Command(BaseCommand):
+    help = "Computes item-item route similarity per gym and stores similar and recommended routes."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--gym', dest='gym', help="Only rebuild the gym with this slug."),
+        make_option('--top', dest='top', type='int', default=10, help="Routes stored per route and per user."),
+    )
+
+    def interactions(self, gym):
+        """
+        Yields (user id, route slug, weight) for every send, favorite and rating at gym.
+        """
+        for user, route in Send.objects.filter(route__gym=gym).values_list('user', 'route'):
+            yield user, route, SEND_WEIGHT
+        for user, route in Favorite.objects.filter(route__gym=gym).values_list('user', 'route'):
+            yield user, route, FAVORITE_WEIGHT
+        for user, route, score in Rating.objects.filter(route__gym=gym).values_list('user', 'route', 'score'):
+            yield user, route, score * RATING_WEIGHT
+
+    def build(self, gym, top):
+        users, routes, rows, cols, data = {}, {}, [], [], []
+        for user, route, weight in self.interactions(gym):
+            rows.append(users.setdefault(user, len(users)))
+            cols.append(routes.setdefault(route, len(routes)))
+            data.append(weight)
+        if not data:
+            return [], []
+        user_ids = sorted(users, key=users.get)
+        slugs = sorted(routes, key=routes.get)
+
+        # Duplicate (user, route) pairs are summed on conversion.
+        matrix = sparse.coo_matrix((data, (rows, cols)), shape=(len(users), len(routes))).tocsc()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+        norms[norms == 0] = 1
+        normalized = matrix.dot(sparse.diags(1.0 / norms, 0))
+
+        live = set(gym.live_routes.values_list('slug', flat=True))
+        live_cols = [i for i, slug in enumerate(slugs) if slug in live]
+        if not live_cols:
+            return [], []
+        # Cosine similarity of every route against every live route.
+        similarity = normalized.T.dot(normalized[:, live_cols]).toarray()
+        for i, col in enumerate(live_cols):
+            similarity[col, i] = 0
+
+        similar = []
+        for i, slug in enumerate(slugs):
+            for rank, (j, score) in enumerate(top_n(similarity[i], top)):
+                similar.append(SimilarRoute(route_id=slug, similar_id=slugs[live_cols[j]], rank=rank, score=score))
+
+        # A climber's affinity for a live route is their interactions weighted by
+        # similarity, ignoring routes they have already climbed, favorited or rated.
+        scores = np.asarray(matrix.dot(similarity))
+        scores[(matrix[:, live_cols] > 0).toarray()] = 0
+        recommended = []
+        for u, user in enumerate(user_ids):
+            for rank, (j, score) in enumerate(top_n(scores[u], top)):
+                recommended.append(RecommendedRoute(user_id=user, route_id=slugs[live_cols[j]], rank=rank, score=score))
+        return similar, recommended
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError("build_recommendations requires numpy and scipy.")
+        gyms = Gym.objects.all()
+        if options.get('gym'):
+            gyms = gyms.filter(slug=options['gym'])
+        for gym in gyms:
+            similar, recommended = self.build(gym, options['top'])
+            with transaction.atomic():
+                SimilarRoute.objects.filter(route__gym=gym).delete()
+                RecommendedRoute.objects.filter(route__gym=gym).delete()
+                SimilarRoute.objects.bulk_create(similar, batch_size=500)
+                RecommendedRoute.objects.bulk_create(recommended, batch_size=500)
+            self.stdout.write("%s: %s similar, %s recommended" % (gym.slug, len(similar), len(recommended)))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from rockgympro.assets import build_bundles
+
+class Command(BaseCommand):
+    help = "Concatenates and minifies STATIC_BUNDLES into STATIC_BUNDLE_ROOT. Run before collectstatic."
+
+    def handle(self, *args, **options):
+        for name, size, bundled in build_bundles():
+            self.stdout.write("%-24s %8d -> %8d bytes" % (name, size, bundled))
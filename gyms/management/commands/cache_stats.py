@@ -0,0 +1,26 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from gyms.lookup import gym_cache
+from rockgympro.cache import cache
+
+class Command(BaseCommand):
+    help = "Reports cache hit rates summed across every worker, as last flushed to the shared cache."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--reset', dest='reset', action='store_true', default=False,
+            help="Zero the shared counters after reporting them."),
+    )
+
+    def report(self, name, counters, stats):
+        self.stdout.write(name)
+        for key, value in sorted(stats.items()):
+            self.stdout.write("  %-16s %s" % (key, value))
+        if self.reset:
+            counters.reset()
+
+    def handle(self, *args, **options):
+        self.reset = options['reset']
+        self.report("tiered cache", cache.counters, cache.shared_stats())
+        self.report("gym cache", gym_cache.counters, gym_cache.shared_stats())
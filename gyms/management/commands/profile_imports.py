@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+def profile_startup(urls=True):
+    """
+    Runs rockgympro.importprofile in a fresh interpreter and returns its results.
+    """
+    args = [sys.executable, "-m", "rockgympro.importprofile"]
+    if urls:
+        args.append("--urls")
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "rockgympro.settings"))
+    return json.loads(subprocess.check_output(args, cwd=settings.BASE_DIR, env=env))
+
+class Command(BaseCommand):
+    help = "Reports the slowest imports made while loading rockgympro.wsgi in a fresh process."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--limit', dest='limit', type='int', default=25, help="Number of imports to report."),
+        make_option('--no-urls', dest='urls', action='store_false', default=True,
+            help="Skip loading ROOT_URLCONF, which Django otherwise imports on the first request."),
+    )
+
+    def handle(self, *args, **options):
+        result = profile_startup(options['urls'])
+        self.stdout.write("Startup took %.0fms\n" % (result['total'] * 1000))
+        self.stdout.write("%10s %10s  %s" % ("total ms", "self ms", "module"))
+        modules = sorted(result['modules'].items(), key=lambda x: x[1][0], reverse=True)
+        for name, (total, own) in modules[:options['limit']]:
+            self.stdout.write("%10.1f %10.1f  %s" % (total * 1000, own * 1000, name))
@@ -0,0 +1,34 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from gyms.models import Gym
+from gyms.publish import publish_gym
+
+class Command(BaseCommand):
+    help = "Publishes static copies of each gym's route board whose routes changed since the last run."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--gym', dest='gym', default=None,
+            help="Only publish the gym with this slug."),
+        make_option('--full', dest='full', action='store_true', default=False,
+            help="Render every route page again, not only the changed ones."),
+        make_option('--interval', dest='interval', type='int', default=None,
+            help="Keep running, checking for changes every this many seconds."),
+    )
+
+    def publish(self, gyms, full):
+        for gym in gyms:
+            pages = publish_gym(gym, full=full)
+            if pages is not None:
+                self.stdout.write("Published %s (%s route pages)" % (gym.slug, pages))
+
+    def handle(self, *args, **options):
+        gyms = Gym.objects.all()
+        if options['gym']:
+            gyms = gyms.filter(slug=options['gym'])
+        self.publish(gyms, options['full'])
+        while options['interval']:
+            time.sleep(options['interval'])
+            self.publish(gyms.all(), False)
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from rockgympro.ratelimit import rejections
+
+class Command(BaseCommand):
+    help = "Reports how many calls each rate-limited endpoint has rejected."
+
+    def handle(self, *args, **options):
+        endpoints = sorted(key for key in settings.RATE_LIMITS if key != 'default')
+        for endpoint, count in sorted(rejections(endpoints).items()):
+            requests, seconds = settings.RATE_LIMITS[endpoint]
+            self.stdout.write("%-20s %4d/%-5ds %8d rejected" % (endpoint, requests, seconds, count))
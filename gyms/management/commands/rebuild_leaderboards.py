@@ -0,0 +1,20 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from gyms.leaderboards import rebuild
+from gyms.models import Gym
+
+class Command(BaseCommand):
+    help = "Recomputes gym leaderboards from the Send table, e.g. after routes are deleted or regraded."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--gym', dest='gym', help="Only rebuild the gym with this slug."),
+    )
+
+    def handle(self, *args, **options):
+        gyms = Gym.objects.all()
+        if options.get('gym'):
+            gyms = gyms.filter(slug=options['gym'])
+        for gym in gyms:
+            self.stdout.write("%s: %s entries" % (gym.slug, rebuild(gym)))
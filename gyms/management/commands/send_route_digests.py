@@ -0,0 +1,102 @@
+import json
+from collections import OrderedDict
+from optparse import make_option
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from gyms.models import DigestRun, FeedBatch, GymFollow, Route
+
+class Command(BaseCommand):
+    help = "Emails each gym follower one digest of the routes completed since the last run."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', dest='batch_size', type='int', default=100,
+            help="Messages sent per connection round trip and checkpoint."),
+    )
+
+    def get_run(self):
+        """
+        Resumes an unfinished run, or starts one covering every undigested route.
+        """
+        try:
+            return DigestRun.objects.filter(finished__isnull=True).latest('started')
+        except DigestRun.DoesNotExist:
+            pass
+        batches = FeedBatch.objects.filter(route_count__gt=F('digested_count'))
+        slices = dict((batch.id, [batch.digested_count, batch.route_count]) for batch in batches)
+        return DigestRun.objects.create(batches=json.dumps(slices))
+
+    def render_sections(self, slices):
+        """
+        Renders each gym's list of new routes once, to be shared by all its followers.
+        """
+        batches = FeedBatch.objects.filter(id__in=slices.keys()).select_related('gym').order_by('gym__name', 'date_set')
+        slugs = OrderedDict()
+        gyms = {}
+        for batch in batches:
+            first, last = slices[str(batch.id)]
+            slugs.setdefault(batch.gym_id, []).extend(batch.route_slugs()[first:last])
+            gyms[batch.gym_id] = batch.gym
+        routes = dict((route.slug, route) for route in Route._base_manager.filter(
+            slug__in=[slug for gym_slugs in slugs.values() for slug in gym_slugs]).select_related('setter', 'gym'))
+        sections = OrderedDict()
+        for gym_id, gym_slugs in slugs.items():
+            gym_routes = [routes[slug] for slug in gym_slugs if slug in routes]
+            if gym_routes:
+                sections[gym_id] = render_to_string("emails/route_digest_gym.txt", dict(gym=gyms[gym_id], routes=gym_routes))
+        return sections
+
+    def recipients(self, run, gym_ids):
+        """
+        Yields (user, [gym ids]) for followers after the run's checkpoint, in user id order.
+        """
+        follows = GymFollow.objects.filter(gym__in=gym_ids, user__id__gt=run.last_user, user__is_active=True) \
+            .exclude(user__email="").order_by('user', 'gym').select_related('user')
+        user, followed = None, []
+        for follow in follows.iterator():
+            if user is not None and follow.user_id != user.id:
+                yield user, followed
+                followed = []
+            user = follow.user
+            followed.append(follow.gym_id)
+        if user is not None:
+            yield user, followed
+
+    def checkpoint(self, connection, run, messages, last_user):
+        connection.send_messages(messages)
+        run.last_user = last_user
+        run.sent += len(messages)
+        run.save()
+
+    def handle(self, *args, **options):
+        run = self.get_run()
+        slices = json.loads(run.batches or "{}")
+        sections = self.render_sections(slices)
+        connection = get_connection()
+        connection.open()
+        try:
+            messages = []
+            for user, gym_ids in self.recipients(run, sections.keys()):
+                body = render_to_string("emails/route_digest.txt", dict(user=user,
+                    sections=[sections[gym_id] for gym_id in gym_ids]))
+                messages.append(EmailMessage("New routes at your gyms", body,
+                    settings.DEFAULT_FROM_EMAIL, [user.email], connection=connection))
+                if len(messages) >= options['batch_size']:
+                    self.checkpoint(connection, run, messages, user.id)
+                    messages = []
+            if messages:
+                self.checkpoint(connection, run, messages, user.id)
+        finally:
+            connection.close()
+        with transaction.atomic():
+            for batch_id, (first, last) in slices.items():
+                FeedBatch.objects.filter(id=batch_id, digested_count__lt=last).update(digested_count=last)
+            run.finished = timezone.now()
+            run.save()
+        self.stdout.write("Sent %s digests" % run.sent)
@@ -0,0 +1,33 @@
+import datetime
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gyms.models import Gym
+from gyms.snapshots import write_snapshots
+
+def parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError("Dates must be formatted YYYY-MM-DD, got '%s'." % value)
+
+class Command(BaseCommand):
+    help = "Records per-gym live route counts by type, grade and location. Run nightly."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--date', dest='date', help="Day to snapshot (YYYY-MM-DD). Defaults to today."),
+        make_option('--gym', dest='gym', help="Only snapshot the gym with this slug."),
+    )
+
+    def gyms(self, options):
+        gyms = Gym.objects.all()
+        if options.get('gym'):
+            gyms = gyms.filter(slug=options['gym'])
+        return gyms
+
+    def handle(self, *args, **options):
+        day = parse_date(options['date']) if options.get('date') else datetime.date.today()
+        for gym in self.gyms(options):
+            rows = write_snapshots(gym, day, day)
+            self.stdout.write("%s: %s rows for %s" % (gym.slug, rows, day))
@@ -0,0 +1,24 @@
+import datetime
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gyms.models import RouteChange
+
+class Command(BaseCommand):
+    help = "Deletes route change log entries older than ROUTE_CHANGES_KEEP_DAYS."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--days', dest='days', type='int', default=None,
+            help="Delete changes recorded more than this many days ago. Defaults to ROUTE_CHANGES_KEEP_DAYS."),
+    )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.ROUTE_CHANGES_KEEP_DAYS
+        cutoff = timezone.now() - datetime.timedelta(days=days)
+        old = RouteChange.objects.filter(created__lt=cutoff)
+        count = old.count()
+        old.delete()
+        self.stdout.write("Deleted %s route changes recorded before %s" % (count, cutoff))
@@ -1,7 +1,123 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+
+from django.conf import settings
 from django.shortcuts import redirect
+from django.utils.cache import patch_vary_headers
+
+from rockgympro import compression
+from rockgympro.routers import PIN_COOKIE, SAFE_METHODS, replicas
+
+timing_logger = logging.getLogger('rockgympro.timing')
+
+def record_timing(request, name, seconds):
+    """
+    Adds seconds to the named step of the request's timing breakdown.
+    """
+    timings = getattr(request, 'timings', None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
 
 class HttpsRedirectMiddleware(object):
 
     def process_request(self, request):
         if request.META.get("HTTP_X_FORWARDED_PROTO", "") == "http":
             return redirect("https://%s%s" % (request.get_host(), request.get_full_path()))
+
+class PrimaryPinMiddleware(object):
+    """
+    Pins a client to the primary database for a short window after it writes,
+    so it reads its own writes instead of a lagging replica.
+    """
+
+    def process_response(self, request, response):
+        if replicas() and request.method not in SAFE_METHODS:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(time.time() + seconds), max_age=seconds)
+        return response
+
+class RequestTimingMiddleware(object):
+    """
+    Times each request and reports the total, along with any steps recorded
+    through record_timing, in a Server-Timing header and the rockgympro.timing
+    log. Streamed responses are only logged, once their body has been sent.
+    Keep this first in MIDDLEWARE_CLASSES so it sees every other step.
+    """
+
+    def process_request(self, request):
+        request.timings = OrderedDict()
+        request.timing_start = time.time()
+
+    def server_timing(self, request):
+        steps = list(request.timings.items()) + [('total', time.time() - request.timing_start)]
+        return ", ".join("%s;dur=%.1f" % (name, seconds * 1000) for name, seconds in steps)
+
+    def log(self, request, response):
+        timing_logger.info("%s %s %s %s", request.method, request.path, response.status_code, self.server_timing(request))
+
+    def stream(self, request, response, content):
+        try:
+            for chunk in content:
+                yield chunk
+        finally:
+            self.log(request, response)
+
+    def process_response(self, request, response):
+        if not hasattr(request, 'timings'):
+            return response
+        if response.streaming:
+            response.streaming_content = self.stream(request, response, response.streaming_content)
+        else:
+            response['Server-Timing'] = self.server_timing(request)
+            self.log(request, response)
+        return response
+
+class CompressionMiddleware(object):
+    """
+    Compresses text responses with brotli or gzip, whichever the client
+    accepts. Small bodies, responses that already have a Content-Encoding and
+    non-text media such as images and PDFs are sent as they are.
+    """
+
+    def process_response(self, request, response):
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+        if not compression.is_compressible(response.get('Content-Type', '')):
+            return response
+        if not response.streaming and len(response.content) < compression.MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.stream(request, response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            start = time.time()
+            content = compression.compress(response.content, encoding)
+            record_timing(request, 'compress', time.time() - start)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub('"$', ';%s"' % encoding, response['ETag'])
+        response['Content-Encoding'] = encoding
+        return response
+
+    def stream(self, request, content, encoding):
+        # Flush after every chunk so streamed pages still arrive progressively.
+        compressor = compression.Compressor(encoding)
+        for chunk in content:
+            start = time.time()
+            data = compressor.compress(chunk) + compressor.flush()
+            record_timing(request, 'compress', time.time() - start)
+            if data:
+                yield data
+        yield compressor.finish()
@@ -0,0 +1,29 @@
+# encoding: utf8
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0015_routeflag'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gym',
+            name='slug',
+            field=models.CharField(max_length=32, db_index=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='route',
+            index_together=set([('gym', 'status', 'date_torn'), ('gym', 'date_set')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='send',
+            index_together=set([('user', 'created')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='routeflag',
+            index_together=set([('route', 'active')]),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# encoding: utf8
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0016_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeSnapshot',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('gym', models.ForeignKey(to='gyms.Gym', to_field=u'id')),
+                ('date', models.DateField()),
+                ('type', models.CharField(max_length=16, choices=[('top_rope', 'Top Rope'), ('bouldering', 'Bouldering'), ('lead', 'Lead')])),
+                ('grade', models.DecimalField(max_digits=10, decimal_places=2)),
+                ('location', models.CharField(max_length=32)),
+                ('count', models.IntegerField()),
+            ],
+            options={
+                u'unique_together': set([('gym', 'date', 'type', 'grade', 'location')]),
+            },
+            bases=(models.Model,),
+        ),
+    ]
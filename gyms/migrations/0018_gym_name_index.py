@@ -0,0 +1,17 @@
+# encoding: utf8
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0017_gradesnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gym',
+            name='name',
+            field=models.CharField(max_length=255, db_index=True),
+        ),
+    ]
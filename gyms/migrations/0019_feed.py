@@ -0,0 +1,45 @@
+# encoding: utf8
+from django.db import models, migrations
+from django.conf import settings
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gyms', '0018_gym_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedBatch',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('edited', models.DateTimeField(auto_now=True)),
+                ('gym', models.ForeignKey(to='gyms.Gym', to_field=u'id')),
+                ('date_set', models.DateField()),
+                ('routes', models.TextField(blank=True)),
+                ('route_count', models.IntegerField(default=0)),
+            ],
+            options={
+                u'unique_together': set([('gym', 'date_set')]),
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL, to_field=u'id')),
+                ('batch', models.ForeignKey(to='gyms.FeedBatch', to_field=u'id')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                u'unique_together': set([('user', 'batch')]),
+                u'index_together': set([('user', 'created')]),
+            },
+            bases=(models.Model,),
+        ),
+    ]
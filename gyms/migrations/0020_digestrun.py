@@ -0,0 +1,33 @@
+# encoding: utf8
+from django.db import models, migrations
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0019_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbatch',
+            name='digested_count',
+            field=models.IntegerField(default=0),
+            preserve_default=True,
+        ),
+        migrations.CreateModel(
+            name='DigestRun',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('started', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished', models.DateTimeField(null=True, blank=True)),
+                ('batches', models.TextField(blank=True)),
+                ('last_user', models.IntegerField(default=0)),
+                ('sent', models.IntegerField(default=0)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# encoding: utf8
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gyms', '0020_digestrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarRoute',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('route', models.ForeignKey(to='gyms.Route', to_field='slug')),
+                ('similar', models.ForeignKey(to='gyms.Route', to_field='slug')),
+                ('rank', models.IntegerField()),
+                ('score', models.FloatField()),
+            ],
+            options={
+                u'index_together': set([('route', 'rank')]),
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='RecommendedRoute',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL, to_field=u'id')),
+                ('route', models.ForeignKey(to='gyms.Route', to_field='slug')),
+                ('rank', models.IntegerField()),
+                ('score', models.FloatField()),
+            ],
+            options={
+                u'index_together': set([('user', 'rank')]),
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# encoding: utf8
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gyms', '0021_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('gym', models.ForeignKey(to='gyms.Gym', to_field=u'id')),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL, to_field=u'id')),
+                ('type', models.CharField(max_length=16, choices=[('top_rope', 'Top Rope'), ('bouldering', 'Bouldering'), ('lead', 'Lead')])),
+                ('period', models.CharField(max_length=8, choices=[('week', 'This Week'), ('month', 'This Month'), ('all', 'All Time')])),
+                ('bucket', models.DateField()),
+                ('sends', models.IntegerField(default=0)),
+                ('hardest', models.DecimalField(null=True, max_digits=10, decimal_places=2, blank=True)),
+            ],
+            options={
+                u'unique_together': set([('gym', 'type', 'period', 'bucket', 'user')]),
+                u'index_together': set([('gym', 'type', 'period', 'bucket', 'sends'), ('gym', 'type', 'period', 'bucket', 'hardest')]),
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# encoding: utf8
+from django.db import models, migrations
+from django.conf import settings
+import django.utils.timezone
+import gyms.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gyms', '0022_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRoute',
+            fields=[
+                ('slug', models.SlugField(serialize=False, primary_key=True)),
+                ('created', models.DateTimeField()),
+                ('edited', models.DateTimeField()),
+                ('archived', models.DateTimeField(default=django.utils.timezone.now)),
+                ('name', models.CharField(max_length=255, blank=True)),
+                ('type', models.CharField(max_length=16, choices=[('top_rope', 'Top Rope'), ('bouldering', 'Bouldering'), ('lead', 'Lead')])),
+                ('grade', models.DecimalField(max_digits=10, decimal_places=2)),
+                ('setter', models.ForeignKey(to_field=u'id', blank=True, to=settings.AUTH_USER_MODEL, null=True)),
+                ('location', models.CharField(max_length=32)),
+                ('date_set', models.DateField()),
+                ('date_torn', models.DateField(null=True, blank=True)),
+                ('gym', models.ForeignKey(to='gyms.Gym', to_field=u'id')),
+                ('notes', models.TextField(blank=True)),
+                ('image', models.ImageField(upload_to=gyms.models.get_image_name, blank=True)),
+                ('views', models.IntegerField(default=0)),
+                ('status', models.CharField(max_length=16, choices=[('complete', 'Complete'), ('in_progress', 'In Progress'), ('not_started', 'Not Started'), ('torn', 'Torn')])),
+                ('color1', models.CharField(default='#ffffff', max_length=7, choices=[('#ffffff', 'Clear'), ('#d11f2d', 'Red'), ('#fef102', 'Yellow'), ('#FF6500', 'Orange'), ('#ed7696', 'Pink'), ('#6f3728', 'Dark Brown'), ('#bd955a', 'Light Brown'), ('#00b2e2', 'Light Blue'), ('#094080', 'Dark Blue'), ('#01b703', 'Lime Green'), ('#f2f2f2', 'White'), ('#009ca8', 'Teal'), ('#007a41', 'Dark Green'), ('#000000', 'Black'), ('#724c9f', 'Purple')])),
+                ('color2', models.CharField(default='#ffffff', max_length=7, choices=[('#ffffff', 'Clear'), ('#d11f2d', 'Red'), ('#fef102', 'Yellow'), ('#FF6500', 'Orange'), ('#ed7696', 'Pink'), ('#6f3728', 'Dark Brown'), ('#bd955a', 'Light Brown'), ('#00b2e2', 'Light Blue'), ('#094080', 'Dark Blue'), ('#01b703', 'Lime Green'), ('#f2f2f2', 'White'), ('#009ca8', 'Teal'), ('#007a41', 'Dark Green'), ('#000000', 'Black'), ('#724c9f', 'Purple')])),
+                ('color3', models.CharField(default='#ffffff', max_length=7, choices=[('#ffffff', 'Clear'), ('#d11f2d', 'Red'), ('#fef102', 'Yellow'), ('#FF6500', 'Orange'), ('#ed7696', 'Pink'), ('#6f3728', 'Dark Brown'), ('#bd955a', 'Light Brown'), ('#00b2e2', 'Light Blue'), ('#094080', 'Dark Blue'), ('#01b703', 'Lime Green'), ('#f2f2f2', 'White'), ('#009ca8', 'Teal'), ('#007a41', 'Dark Green'), ('#000000', 'Black'), ('#724c9f', 'Purple')])),
+            ],
+            options={
+            },
+            bases=(gyms.models.GradedMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name='ArchivedSend',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', models.DateTimeField()),
+                ('edited', models.DateTimeField()),
+                ('route', models.ForeignKey(to='gyms.ArchivedRoute', to_field='slug')),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL, to_field=u'id')),
+            ],
+            options={
+                u'index_together': set([('user', 'created')]),
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='ArchivedFavorite',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', models.DateTimeField()),
+                ('edited', models.DateTimeField()),
+                ('route', models.ForeignKey(to='gyms.ArchivedRoute', to_field='slug')),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL, to_field=u'id')),
+            ],
+            options={
+                u'index_together': set([('user', 'created')]),
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='ArchivedRating',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', models.DateTimeField()),
+                ('edited', models.DateTimeField()),
+                ('route', models.ForeignKey(to='gyms.ArchivedRoute', to_field='slug')),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL, to_field=u'id')),
+                ('score', models.IntegerField()),
+            ],
+            options={
+                u'abstract': False,
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='ArchivedRouteFlag',
+            fields=[
+                (u'id', models.AutoField(verbose_name=u'ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', models.DateTimeField()),
+                ('edited', models.DateTimeField()),
+                ('route', models.ForeignKey(to='gyms.ArchivedRoute', to_field='slug')),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL, to_field=u'id')),
+                ('active', models.BooleanField(default=True)),
+                ('message', models.TextField()),
+            ],
+            options={
+                u'abstract': False,
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AddField(
+            model_name='archivedroute',
+            name='sends',
+            field=models.ManyToManyField(to=settings.AUTH_USER_MODEL, through='gyms.ArchivedSend'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='archivedroute',
+            name='favorites',
+            field=models.ManyToManyField(to=settings.AUTH_USER_MODEL, through='gyms.ArchivedFavorite'),
+            preserve_default=True,
+        ),
+    ]
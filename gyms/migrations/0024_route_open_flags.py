@@ -0,0 +1,35 @@
+# encoding: utf8
+from django.db import models, migrations
+from django.db.models import Count
+
+
+def count_open_flags(apps, schema_editor):
+    Route = apps.get_model('gyms', 'Route')
+    RouteFlag = apps.get_model('gyms', 'RouteFlag')
+    for row in RouteFlag.objects.filter(active=True).values('route').annotate(count=Count('id')):
+        Route.objects.filter(slug=row['route']).update(open_flags=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0023_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='open_flags',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=True,
+        ),
+        migrations.AlterIndexTogether(
+            name='route',
+            index_together=set([('gym', 'status', 'date_torn'), ('gym', 'date_set'), ('gym', 'open_flags')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='routeflag',
+            index_together=set([('route', 'active'), ('active', 'created')]),
+        ),
+        migrations.RunPython(count_open_flags),
+    ]
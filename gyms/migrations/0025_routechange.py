@@ -0,0 +1,34 @@
+# encoding: utf8
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0024_route_open_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gym',
+            name='change_seq',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=True,
+        ),
+        migrations.CreateModel(
+            name='RouteChange',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('seq', models.PositiveIntegerField()),
+                ('route', models.CharField(max_length=50)),
+                ('kind', models.CharField(max_length=8, choices=[('created', 'Created'), ('updated', 'Updated'), ('torn', 'Torn'), ('deleted', 'Deleted'), ('score', 'Score Changed')])),
+                ('data', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('gym', models.ForeignKey(to='gyms.Gym', to_field='id')),
+            ],
+            options={
+                'unique_together': set([('gym', 'seq')]),
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# encoding: utf8
+from django.db import models, migrations
+from django.db.models import Count, Min
+
+
+def dedupe_sends(apps, schema_editor):
+    Send = apps.get_model('gyms', 'Send')
+    duplicates = Send.objects.values('route', 'user').annotate(count=Count('id'), first=Min('id')).filter(count__gt=1)
+    for row in duplicates:
+        Send.objects.filter(route=row['route'], user=row['user']).exclude(id=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gyms', '0025_routechange'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_sends),
+        migrations.AlterUniqueTogether(
+            name='send',
+            unique_together=set([('route', 'user')]),
+        ),
+    ]
@@ -1,15 +1,17 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 import random
 from django.utils import timezone
-from django.db.models import Count
-from collections import OrderedDict
+from django.db.models import Count, Sum
+from collections import Counter, OrderedDict, defaultdict
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 import datetime
 from hashlib import sha256
 import base64
 
+from rockgympro.cache import cache
+
 class DatedMixin(models.Model):
 
     created = models.DateTimeField(auto_now_add=True)
@@ -21,13 +23,26 @@ class DatedMixin(models.Model):
 class SluggedMixin(models.Model):
     slug = models.SlugField(primary_key=True, unique=True, editable=False, blank=True)
 
+    SLUG_CHARS = '1234567890abcdefghjkmnpqrstuvwxyz'
+
     def save(self, *args, **kwargs):
-        while not self.slug:
-            newslug = "".join(random.sample('1234567890abcdefghjkmnpqrstuvwxyz', 5))
-            if self.__class__.objects.filter(slug=newslug).count() == 0:
-                self.slug = newslug
+        if not self.slug:
+            self.slug = self.__class__.allocate_slugs(1)[0]
         super(SluggedMixin, self).save(*args, **kwargs)
 
+    @classmethod
+    def allocate_slugs(cls, count):
+        """
+        Returns count distinct unused slugs, checking each block of candidates
+        against the table in one query.
+        """
+        slugs = set()
+        while len(slugs) < count:
+            candidates = set("".join(random.sample(cls.SLUG_CHARS, 5)) for i in range(count - len(slugs))) - slugs
+            taken = cls._base_manager.filter(slug__in=candidates).values_list('slug', flat=True)
+            slugs |= candidates - set(taken)
+        return list(slugs)
+
     class Meta:
         abstract = True
 
@@ -143,12 +158,34 @@ def build_ratings():
 
 build_ratings()
 
+def grade_bounds(format, label):
+    """
+    (low, high) for the stored grades that display as label in format: grades
+    above low and up to high, either end None when unbounded. Raises KeyError
+    when label isn't in the scale.
+    """
+    scale = sorted(rating_scales[format])
+    values = [Decimal(value) for value, name in scale]
+    labels = [name for value, name in scale]
+    if label not in labels:
+        raise KeyError(label)
+    i = labels.index(label)
+    low = (values[i - 1] + values[i]) / 2 if i > 0 else None
+    high = (values[i] + values[i + 1]) / 2 if i + 1 < len(values) else None
+    return low, high
+
+def setter_name(row):
+    """
+    User.get_full_name() for a values() row with setter__name and setter__username.
+    """
+    return (row['setter__name'] or '').strip() or row['setter__username']
+
 class Gym(DatedMixin):
 
     objects = GymManager()
 
-    name = models.CharField(max_length=255)
-    slug = models.CharField(max_length=32)
+    name = models.CharField(max_length=255, db_index=True)
+    slug = models.CharField(max_length=32, db_index=True)
     followers = models.ManyToManyField(settings.AUTH_USER_MODEL, through='GymFollow', related_name="gyms")
 
     location_options = models.TextField(blank=True)
@@ -185,10 +222,75 @@ class Gym(DatedMixin):
     top_rope_format = models.CharField(max_length=16, choices=TOP_ROPE_FORMAT_CHOICES, default="yds_plusminus")
     lead_format = models.CharField(max_length=16, choices=TOP_ROPE_FORMAT_CHOICES, default="yds_plusminus")
     bouldering_format = models.CharField(max_length=16, choices=BOULDERING_FORMAT_CHOICES, default="hueco")
+    # Sequence number of the gym's latest RouteChange, advanced by gyms.changes.
+    change_seq = models.PositiveIntegerField(default=0)
+
+    # Correlated subqueries for Gym.objects.extra(), so a page of gyms gets its
+    # counts in one query. Takes today's date as its only select param.
+    DIRECTORY_COUNTS = OrderedDict([
+        ('live_route_count', "SELECT COUNT(*) FROM gyms_route WHERE gyms_route.gym_id = gyms_gym.id "
+            "AND gyms_route.status = 'complete' AND (gyms_route.date_torn IS NULL OR gyms_route.date_torn > %s)"),
+        ('follower_count', "SELECT COUNT(*) FROM gyms_gymfollow WHERE gyms_gymfollow.gym_id = gyms_gym.id"),
+        ('last_date_set', "SELECT MAX(gyms_route.date_set) FROM gyms_route WHERE gyms_route.gym_id = gyms_gym.id"),
+    ])
 
     def __unicode__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Never write back a stale copy of the change sequence.
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'change_seq']
+        super(Gym, self).save(*args, **kwargs)
+        from gyms.lookup import gym_cache
+        gym_cache.changed()
+
+    def delete(self, *args, **kwargs):
+        super(Gym, self).delete(*args, **kwargs)
+        from gyms.lookup import gym_cache
+        gym_cache.changed()
+
+    def routes_version(self):
+        """
+        Counter bumped whenever the gym's routes change. Caches built from its
+        routes include it in their key instead of being deleted one by one.
+        """
+        return cache.shared.get("routes_version:%s" % self.pk) or 0
+
+    def routes_changed(self):
+        key = "routes_version:%s" % self.pk
+        try:
+            cache.shared.incr(key)
+        except ValueError:
+            cache.shared.set(key, 1, None)
+
+    def reset_location(self, location, routes):
+        """
+        Tears every live route at location and inserts routes in their place in
+        one transaction, then invalidates the gym's route caches once.
+        Returns the number of routes torn.
+        """
+        from gyms import changes
+        with transaction.atomic():
+            # The base manager skips RouteManager's rating aggregate.
+            live = Route._base_manager.filter(gym=self, location=location, status="complete")
+            torn = list(live.values_list('slug', flat=True))
+            Route._base_manager.filter(slug__in=torn).update(status="torn", date_torn=datetime.date.today())
+            changes.record(self.pk, 'torn', [(slug, dict(status="torn")) for slug in torn])
+            for route in routes:
+                route.gym = self
+                route.location = location
+            Route.insert_routes(routes)
+        changes.cache_seq(self.pk)
+        self.routes_changed()
+        return len(torn)
+
+    def open_flag_count(self):
+        # Reads only the flagged routes, through the (gym, open_flags) index.
+        routes = Route._base_manager.filter(gym=self, open_flags__gt=0)
+        return routes.aggregate(count=models.Sum('open_flags'))['count'] or 0
+
     @property
     def num_live_routes(self):
         try:
@@ -221,9 +323,52 @@ class Gym(DatedMixin):
         return d if len(d) > 1 else {}
 
     def setters(self):
-        d = {get_user_model().objects.get(id=x['setter']).get_full_name() or get_user_model().objects.get(id=x['setter']).username if x['setter'] else 'Unknown':x['count']*1.0 for x in self.live_routes.values('setter').annotate(count=Count('slug'))}
+        d = {setter_name(x) if x['setter'] else 'Unknown':x['count']*1.0 for x in self.live_routes.values('setter', 'setter__name', 'setter__username').annotate(count=Count('slug'))}
         return d if len(d) > 1 else {}
 
+    def setter_report(self, start, end):
+        """
+        Per-setter output, grade spread, average rating and flag rate for routes
+        set between start and end, from a handful of grouped queries.
+        """
+        days = (end - start).days + 1
+        types = dict(Route.TYPE_CHOICES)
+        names, counts, spread = {}, Counter(), defaultdict(Counter)
+        score_totals, ratings, flags = Counter(), Counter(), Counter()
+        # Routes moved to the archive since still count for when they were set.
+        for route_model, rating_model, flag_model in ((Route, Rating, RouteFlag),
+                (ArchivedRoute, ArchivedRating, ArchivedRouteFlag)):
+            # The base managers skip the rating aggregates.
+            routes = route_model._base_manager.filter(gym=self, status__in=Route.LIVE_STATUSES,
+                date_set__gte=start, date_set__lte=end)
+            for x in routes.values('setter', 'setter__name', 'setter__username', 'type', 'grade').annotate(count=Count('slug')):
+                names[x['setter']] = setter_name(x) if x['setter'] else 'Unknown'
+                counts[x['setter']] += x['count']
+                spread[x['setter']][(x['type'], x['grade'])] += x['count']
+            for x in rating_model.objects.filter(route__in=routes).values('route__setter').annotate(total=Sum('score'), count=Count('id')):
+                score_totals[x['route__setter']] += x['total']
+                ratings[x['route__setter']] += x['count']
+            for x in flag_model.objects.filter(route__in=routes).values('route__setter').annotate(count=Count('id')):
+                flags[x['route__setter']] += x['count']
+        report = []
+        for setter, count in counts.most_common():
+            grades = OrderedDict()
+            for (type, grade), n in sorted(spread[setter].items()):
+                label = Route(gym=self, type=type, grade=grade).get_grade_display()
+                by_label = grades.setdefault(types[type], OrderedDict())
+                by_label[label] = by_label.get(label, 0) + n
+            report.append(dict(
+                setter=names[setter],
+                routes=count,
+                per_week=round(count * 7.0 / days, 2),
+                grades=grades,
+                score=round(score_totals[setter] * 1.0 / ratings[setter], 2) if ratings[setter] else None,
+                ratings=ratings[setter],
+                flags=flags[setter],
+                flag_rate=round(flags[setter] * 1.0 / count, 3),
+            ))
+        return report
+
     def locations(self):
         d = {x['location']:x['count']*1.0 for x in self.live_routes.values('location').annotate(count=Count('slug'))}
         return d if len(d) > 1 else {}
@@ -238,7 +383,7 @@ class GymFollow(DatedMixin):
 
 class RouteManager(models.Manager):
     def get_queryset(self):
-        return super(RouteManager, self).get_queryset().annotate(score=models.Avg('rating__score'), num_flags=models.Count('routeflag'))
+        return super(RouteManager, self).get_queryset().annotate(score=models.Avg('rating__score'))
 
 def get_image_name(self, filename):
         sha = sha256()
@@ -247,7 +392,29 @@ def get_image_name(self, filename):
         f.seek(0)
         return "route_images/%s.%s" % (base64.urlsafe_b64encode(sha.digest()).replace("=","_"), filename.split(".")[-1])
 
-class Route(DatedMixin, SluggedMixin):
+class GradedMixin(object):
+    """
+    Grade and tape display shared by live and archived routes.
+    """
+
+    def get_grade(self):
+        if self.grade is None:
+            return None
+        format = getattr(self.gym, "%s_format" % self.type)
+        grade_list = sorted(rating_scales[format], key=lambda x:abs(x[0]-self.grade))
+        return grade_list[0][0]
+
+    def get_grade_display(self):
+        if self.grade is None:
+            return None
+        format = getattr(self.gym, "%s_format" % self.type)
+        grade_list = sorted(rating_scales[format], key=lambda x:abs(x[0]-self.grade))
+        return grade_list[0][1]
+
+    def colors(self):
+        return [color for color in [self.color1, self.color2, self.color3] if color !="#ffffff"]
+
+class Route(DatedMixin, SluggedMixin, GradedMixin):
     name = models.CharField(blank=True, max_length=255)
 
     objects = RouteManager()
@@ -270,6 +437,10 @@ class Route(DatedMixin, SluggedMixin):
     sends = models.ManyToManyField(settings.AUTH_USER_MODEL, through="Send", related_name="sends")
     favorites = models.ManyToManyField(settings.AUTH_USER_MODEL, through="Favorite", related_name="favorites")
     views = models.IntegerField(default=0)
+    # Active RouteFlags, kept up to date by add_flag and the dismiss methods.
+    open_flags = models.PositiveIntegerField(default=0)
+
+    is_archived = False
 
     STATUS_CHOICES = (
         ('complete', 'Complete'),
@@ -277,23 +448,8 @@ class Route(DatedMixin, SluggedMixin):
         ('not_started', 'Not Started'),
         ('torn', 'Torn'),
     )
-
-    def get_grade(self):
-        if self.grade is None:
-            return None
-        format = getattr(self.gym, "%s_format" % self.type)
-        grade_list = sorted(rating_scales[format], key=lambda x:abs(x[0]-self.grade))
-        return grade_list[0][0]
-
-    def get_grade_display(self):
-        if self.grade is None:
-            return None
-        format = getattr(self.gym, "%s_format" % self.type)
-        grade_list = sorted(rating_scales[format], key=lambda x:abs(x[0]-self.grade))
-        return grade_list[0][1]
-
-    def colors(self):
-        return [color for color in [self.color1, self.color2, self.color3] if color !="#ffffff"]
+    # Routes that have actually been up on the wall.
+    LIVE_STATUSES = ('complete', 'torn')
 
     status = models.CharField(choices=STATUS_CHOICES, max_length=16, blank=False, default="complete")
 
@@ -319,13 +475,99 @@ class Route(DatedMixin, SluggedMixin):
     color2 = models.CharField(max_length=7, choices=COLOR_CHOICES, default="#ffffff")
     color3 = models.CharField(max_length=7, choices=COLOR_CHOICES, default="#ffffff")
 
+    def __init__(self, *args, **kwargs):
+        super(Route, self).__init__(*args, **kwargs)
+        self._saved_status = self.status if self.slug else None
+
     def save(self, *args, **kwargs):
         if self.status == 'torn':
             if not self.date_torn:
                 self.date_torn = datetime.date.today()
         else:
             self.date_torn = None
+        adding = self._state.adding
+        if not adding and kwargs.get('update_fields') is None:
+            # Never write back a stale copy of the flag counter.
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'open_flags']
         super(Route, self).save(*args, **kwargs)
+        if self.status == 'complete' and self._saved_status != 'complete':
+            from gyms.feeds import publish_routes
+            publish_routes([self])
+        from gyms import changes
+        if adding:
+            changes.record_routes('created', [self])
+        elif self.status == 'torn' and self._saved_status != 'torn':
+            changes.record_routes('torn', [self])
+        else:
+            changes.record_routes('updated', [self])
+        self._saved_status = self.status
+        self.gym.routes_changed()
+
+    def delete(self, *args, **kwargs):
+        gym, slug = self.gym, self.slug
+        super(Route, self).delete(*args, **kwargs)
+        from gyms import changes
+        changes.record(gym.pk, 'deleted', [(slug, {})])
+        gym.routes_changed()
+
+    def active_flags(self):
+        return self.routeflag_set.filter(active=True).select_related('user').order_by('-created')
+
+    @transaction.atomic
+    def add_flag(self, user, message):
+        flag = RouteFlag.objects.create(route=self, user=user, message=message)
+        Route._base_manager.filter(slug=self.slug).update(open_flags=models.F('open_flags') + 1)
+        return flag
+
+    @transaction.atomic
+    def dismiss_flags(self):
+        self.routeflag_set.filter(active=True).update(active=False, edited=timezone.now())
+        Route._base_manager.filter(slug=self.slug).update(open_flags=0)
+        self.open_flags = 0
+
+    @classmethod
+    def bulk_add(cls, routes):
+        """
+        Inserts routes with insert_routes, then invalidates each gym's route
+        caches once.
+        """
+        cls.insert_routes(routes)
+        from gyms import changes
+        for gym in set(route.gym for route in routes):
+            changes.cache_seq(gym.pk)
+            gym.routes_changed()
+        return routes
+
+    @classmethod
+    @transaction.atomic
+    def insert_routes(cls, routes):
+        """
+        Inserts new routes in batches with one block of slugs, and publishes the
+        complete ones to followers together.
+        """
+        for route, slug in zip(routes, cls.allocate_slugs(len(routes))):
+            route.slug = slug
+            if route.status != 'torn':
+                route.date_torn = None
+            elif not route.date_torn:
+                route.date_torn = datetime.date.today()
+        cls.objects.bulk_create(routes, batch_size=100)
+        for route in routes:
+            route._saved_status = route.status
+            route._state.adding = False
+        from gyms import changes
+        changes.record_routes('created', routes)
+        from gyms.feeds import publish_routes
+        publish_routes([route for route in routes if route.status == 'complete'])
+        return routes
+
+    class Meta:
+        index_together = (
+            ("gym", "status", "date_torn"),
+            ("gym", "date_set"),
+            ("gym", "open_flags"),
+        )
 
 class RouteUserMixin(models.Model):
     route = models.ForeignKey(Route)
@@ -341,11 +583,211 @@ class RouteFlag(DatedMixin, models.Model):
     active = models.BooleanField(default=True)
     message = models.TextField()
 
+    @transaction.atomic
+    def dismiss(self):
+        if RouteFlag.objects.filter(id=self.id, active=True).update(active=False, edited=timezone.now()):
+            Route._base_manager.filter(slug=self.route_id, open_flags__gt=0).update(open_flags=models.F('open_flags') - 1)
+        self.active = False
+
+    class Meta:
+        index_together = (("route", "active"), ("active", "created"))
+
 class Send(DatedMixin, RouteUserMixin, models.Model):
-    pass
+
+    class Meta(RouteUserMixin.Meta):
+        index_together = (("user", "created"),)
 
 class Favorite(DatedMixin, RouteUserMixin, models.Model):
     pass
 
 class Rating(DatedMixin, RouteUserMixin, models.Model):
     score = models.IntegerField()
+
+class GradeSnapshot(models.Model):
+    """
+    Number of live routes at a gym on a given day, per type, grade and location.
+    """
+    gym = models.ForeignKey(Gym, related_name='grade_snapshots')
+    date = models.DateField()
+    type = models.CharField(choices=Route.TYPE_CHOICES, max_length=16)
+    grade = models.DecimalField(max_digits=10, decimal_places=2)
+    location = models.CharField(max_length=32)
+    count = models.IntegerField()
+
+    class Meta:
+        unique_together = (("gym", "date", "type", "grade", "location"),)
+
+class FeedBatch(DatedMixin):
+    """
+    Routes completed at a gym in one setting session, shared by every follower's FeedEntry.
+    """
+    gym = models.ForeignKey(Gym, related_name='feed_batches')
+    date_set = models.DateField()
+    routes = models.TextField(blank=True)
+    route_count = models.IntegerField(default=0)
+    digested_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (("gym", "date_set"),)
+
+    def route_slugs(self):
+        return [slug for slug in self.routes.split(",") if slug]
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='feed_entries')
+    batch = models.ForeignKey(FeedBatch, related_name='entries')
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = (("user", "batch"),)
+        index_together = (("user", "created"),)
+
+class DigestRun(models.Model):
+    """
+    Progress of one send_route_digests run, so a crashed run resumes without resending.
+    """
+    started = models.DateTimeField(default=timezone.now)
+    finished = models.DateTimeField(blank=True, null=True)
+    # JSON {batch id: [first, last]} slices of FeedBatch.routes covered by this run.
+    batches = models.TextField(blank=True)
+    last_user = models.IntegerField(default=0)
+    sent = models.IntegerField(default=0)
+
+class SimilarRoute(models.Model):
+    """
+    Live routes most often sent, favorited or rated by the same climbers, built by build_recommendations.
+    """
+    route = models.ForeignKey(Route, related_name='similar_routes')
+    similar = models.ForeignKey(Route, related_name='+')
+    rank = models.IntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        index_together = (("route", "rank"),)
+
+class RecommendedRoute(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='recommended_routes')
+    route = models.ForeignKey(Route, related_name='+')
+    rank = models.IntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        index_together = (("user", "rank"),)
+
+class LeaderboardEntry(models.Model):
+    """
+    A climber's sends at a gym for one route type and time bucket, kept current by gyms.leaderboards.
+    """
+    PERIOD_CHOICES = (
+        ('week', 'This Week'),
+        ('month', 'This Month'),
+        ('all', 'All Time'),
+    )
+
+    gym = models.ForeignKey(Gym, related_name='leaderboard_entries')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='leaderboard_entries')
+    type = models.CharField(choices=Route.TYPE_CHOICES, max_length=16)
+    period = models.CharField(choices=PERIOD_CHOICES, max_length=8)
+    bucket = models.DateField()
+    sends = models.IntegerField(default=0)
+    hardest = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+
+    class Meta:
+        unique_together = (("gym", "type", "period", "bucket", "user"),)
+        index_together = (
+            ("gym", "type", "period", "bucket", "sends"),
+            ("gym", "type", "period", "bucket", "hardest"),
+        )
+
+class RouteChange(models.Model):
+    """
+    One entry in a gym's route change log. seq increases by one per entry
+    within a gym, and clients poll with the last seq they saw.
+    """
+    KIND_CHOICES = (
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('torn', 'Torn'),
+        ('deleted', 'Deleted'),
+        ('score', 'Score Changed'),
+    )
+
+    gym = models.ForeignKey(Gym, related_name='route_changes')
+    seq = models.PositiveIntegerField()
+    route = models.CharField(max_length=50)
+    kind = models.CharField(choices=KIND_CHOICES, max_length=8)
+    data = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (("gym", "seq"),)
+
+class ArchivedRouteManager(models.Manager):
+    def get_queryset(self):
+        return super(ArchivedRouteManager, self).get_queryset().annotate(score=models.Avg('rating_set__score'), num_flags=models.Count('routeflag_set'))
+
+class ArchivedRoute(GradedMixin, models.Model):
+    """
+    A route torn long enough ago to be moved out of the Route table by archive_routes.
+    """
+    slug = models.SlugField(primary_key=True)
+    created = models.DateTimeField()
+    edited = models.DateTimeField()
+    archived = models.DateTimeField(default=timezone.now)
+    name = models.CharField(blank=True, max_length=255)
+
+    objects = ArchivedRouteManager()
+
+    type = models.CharField(choices=Route.TYPE_CHOICES, max_length=16)
+    grade = models.DecimalField(max_digits=10, decimal_places=2)
+    setter = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='archived_routes', blank=True, null=True)
+    location = models.CharField(max_length=32)
+    date_set = models.DateField()
+    date_torn = models.DateField(blank=True, null=True)
+    gym = models.ForeignKey(Gym, related_name='archived_routes')
+    notes = models.TextField(blank=True)
+    image = models.ImageField(blank=True, upload_to=get_image_name)
+    sends = models.ManyToManyField(settings.AUTH_USER_MODEL, through="ArchivedSend", related_name="archived_route_sends")
+    favorites = models.ManyToManyField(settings.AUTH_USER_MODEL, through="ArchivedFavorite", related_name="archived_route_favorites")
+    views = models.IntegerField(default=0)
+    status = models.CharField(choices=Route.STATUS_CHOICES, max_length=16)
+    color1 = models.CharField(max_length=7, choices=Route.COLOR_CHOICES, default="#ffffff")
+    color2 = models.CharField(max_length=7, choices=Route.COLOR_CHOICES, default="#ffffff")
+    color3 = models.CharField(max_length=7, choices=Route.COLOR_CHOICES, default="#ffffff")
+
+    is_archived = True
+
+class ArchivedActivity(models.Model):
+    """
+    Copies of a Send, Favorite, Rating or RouteFlag row, keeping its original timestamps.
+    """
+    created = models.DateTimeField()
+    edited = models.DateTimeField()
+
+    class Meta:
+        abstract = True
+
+class ArchivedSend(ArchivedActivity):
+    route = models.ForeignKey(ArchivedRoute, related_name='send_set')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='archived_sends')
+
+    class Meta:
+        index_together = (("user", "created"),)
+
+class ArchivedFavorite(ArchivedActivity):
+    route = models.ForeignKey(ArchivedRoute, related_name='favorite_set')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='archived_favorites')
+
+    class Meta:
+        index_together = (("user", "created"),)
+
+class ArchivedRating(ArchivedActivity):
+    route = models.ForeignKey(ArchivedRoute, related_name='rating_set')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='archived_ratings')
+    score = models.IntegerField()
+
+class ArchivedRouteFlag(ArchivedActivity):
+    route = models.ForeignKey(ArchivedRoute, related_name='routeflag_set')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='archived_flags')
+    active = models.BooleanField(default=True)
+    message = models.TextField()
@@ -0,0 +1,173 @@
+"""
+PDF route lists and wall tags drawn straight onto a reportlab canvas.
+
+Routes are read from the iterator one page's worth at a time, so the
+route rows never have to be in memory at once. The canvas still keeps
+every finished page until save(), and the whole PDF is written to out
+at the end, so the document itself is not streamed. reportlab is
+imported here rather than at the top of views.py because it is slow to
+import.
+"""
+from itertools import islice
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.barcode import qr
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+from gyms.rows import route_rows
+
+FONT = "Helvetica"
+BOLD = "Helvetica-Bold"
+MARGIN = 0.5 * inch
+ROW_HEIGHT = 22
+
+TAG_COLUMNS = 2
+TAG_ROWS = 4
+TAG_WIDTH = 3.75 * inch
+TAG_HEIGHT = 2.5 * inch
+QR_SIZE = 1.1 * inch
+
+def pages(routes, size):
+    routes = iter(routes)
+    while True:
+        page = list(islice(routes, size))
+        if not page:
+            return
+        yield page
+
+def fit(pdf, text, font, size, width):
+    """
+    Cuts text down to width points, ending in "..." when anything was cut.
+    """
+    text = text or ""
+    if pdf.stringWidth(text, font, size) <= width:
+        return text
+    while text and pdf.stringWidth(text + "...", font, size) > width:
+        text = text[:-1]
+    return text + "..."
+
+def draw_swatches(pdf, route_colors, x, y, width, height):
+    """
+    Fills the box at x, y with one band per tape color, outlined in black.
+    """
+    if not route_colors:
+        return
+    band = float(width) / len(route_colors)
+    for i, color in enumerate(route_colors):
+        pdf.setFillColor(colors.HexColor(color))
+        pdf.rect(x + i * band, y, band, height, stroke=0, fill=1)
+    pdf.setStrokeColor(colors.black)
+    pdf.rect(x, y, width, height, stroke=1, fill=0)
+    pdf.setFillColor(colors.black)
+
+def draw_qr(pdf, url, x, y, size):
+    widget = qr.QrCodeWidget(url)
+    x1, y1, x2, y2 = widget.getBounds()
+    drawing = Drawing(size, size, transform=[size / (x2 - x1), 0, 0, size / (y2 - y1), 0, 0])
+    drawing.add(widget)
+    renderPDF.draw(drawing, pdf, x, y)
+
+def list_columns(gym):
+    """
+    (heading, width) for each column of the route list, filling the page.
+    """
+    columns = [("Color", 0.9 * inch), ("Grade", 1.0 * inch), ("Location", 1.9 * inch),
+        ("Setter", 1.7 * inch), ("Set", 0.9 * inch)]
+    if gym.named_routes:
+        columns.insert(0, ("Name", 1.7 * inch))
+    spare = (letter[0] - 2 * MARGIN - sum(width for heading, width in columns)) / len(columns)
+    return [(heading, width + spare) for heading, width in columns]
+
+def route_list_pdf(out, gym, routes, title=None):
+    """
+    Writes routes to out as a table of name, colors, grade, location, setter
+    and date set, with the headings repeated on every page.
+    """
+    pdf = canvas.Canvas(out, pagesize=letter, pageCompression=1)
+    pdf.setTitle(title or "%s routes" % gym.name)
+    width, height = letter
+    columns = list_columns(gym)
+    top = height - MARGIN - (30 if title else 0)
+    per_page = int((top - MARGIN - 2 * ROW_HEIGHT) / ROW_HEIGHT)
+    number = 0
+    for page in pages(routes, per_page):
+        number += 1
+        if title:
+            pdf.setFont(BOLD, 16)
+            pdf.drawString(MARGIN, height - MARGIN - 16, title)
+        pdf.setFont(BOLD, 11)
+        x = MARGIN
+        for heading, column in columns:
+            pdf.drawString(x, top - ROW_HEIGHT + 6, heading)
+            x += column
+        pdf.line(MARGIN, top - ROW_HEIGHT + 2, width - MARGIN, top - ROW_HEIGHT + 2)
+        pdf.setFont(FONT, 11)
+        y = top - ROW_HEIGHT
+        for row, route in zip(route_rows(page, gym, None), page):
+            y -= ROW_HEIGHT
+            cells = [row.colors, row.grade, row.location, row.setter_name, route.date_set.strftime("%m/%d/%Y")]
+            if gym.named_routes:
+                cells.insert(0, row.name)
+            x = MARGIN
+            for (heading, column), value in zip(columns, cells):
+                if heading == "Color":
+                    draw_swatches(pdf, value, x, y + 4, 0.6 * inch, 12)
+                else:
+                    pdf.drawString(x, y + 6, fit(pdf, value, FONT, 11, column - 6))
+                x += column
+        pdf.setFont(FONT, 9)
+        pdf.drawRightString(width - MARGIN, MARGIN / 2, "Page %s" % number)
+        pdf.showPage()
+    finish(pdf, number)
+
+def finish(pdf, number):
+    if not number:
+        pdf.setFont(FONT, 12)
+        pdf.drawString(MARGIN, letter[1] - MARGIN - 12, "No routes.")
+        pdf.showPage()
+    pdf.save()
+
+def draw_tag(pdf, gym, row, route, x, y, link):
+    pdf.setStrokeColor(colors.lightgrey)
+    pdf.rect(x, y, TAG_WIDTH, TAG_HEIGHT, stroke=1, fill=0)
+    inset = 0.15 * inch
+    draw_swatches(pdf, row.colors, x + inset, y + TAG_HEIGHT - inset - 0.3 * inch, TAG_WIDTH - 2 * inset, 0.3 * inch)
+    text_width = TAG_WIDTH - 2 * inset - (QR_SIZE if link else 0)
+    line = y + TAG_HEIGHT - inset - 0.3 * inch - 32
+    pdf.setFont(BOLD, 28)
+    pdf.drawString(x + inset, line, fit(pdf, row.grade, BOLD, 28, text_width))
+    pdf.setFont(FONT, 10)
+    details = [row.location, row.setter_name, "Set %s" % route.date_set.strftime("%m/%d/%Y")]
+    if gym.named_routes and row.name:
+        details.insert(0, row.name)
+    for detail in details:
+        line -= 14
+        pdf.drawString(x + inset, line, fit(pdf, detail, FONT, 10, text_width))
+    if link:
+        draw_qr(pdf, link(row.slug), x + TAG_WIDTH - inset - QR_SIZE, y + inset, QR_SIZE)
+
+def wall_tags_pdf(out, gym, routes, link=None):
+    """
+    Writes a printable tag for each route to out, eight to a page with light
+    cut lines: tape colors, grade, name, location, setter and date set. When
+    link is given, it maps a route slug to the absolute URL encoded in a QR
+    code on the tag.
+    """
+    pdf = canvas.Canvas(out, pagesize=letter, pageCompression=1)
+    pdf.setTitle("%s wall tags" % gym.name)
+    width, height = letter
+    left = (width - TAG_COLUMNS * TAG_WIDTH) / 2
+    bottom = (height - TAG_ROWS * TAG_HEIGHT) / 2
+    number = 0
+    for page in pages(routes, TAG_COLUMNS * TAG_ROWS):
+        number += 1
+        for i, (row, route) in enumerate(zip(route_rows(page, gym, None), page)):
+            column, rank = i % TAG_COLUMNS, i // TAG_COLUMNS
+            draw_tag(pdf, gym, row, route, left + column * TAG_WIDTH,
+                bottom + (TAG_ROWS - rank - 1) * TAG_HEIGHT, link)
+        pdf.showPage()
+    finish(pdf, number)
@@ -0,0 +1,110 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.core import urlresolvers
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import HttpRequest
+
+from rockgympro.cache import cache
+
+from gyms import changes
+from gyms.rows import route_rows
+from gyms.views import RoutePage, RoutesPage
+
+PUBLISHED_KEY = "board_published:%s"
+
+def board_path(gym, name):
+    return "%s/%s/%s" % (settings.BOARD_SNAPSHOT_ROOT, gym.slug, name)
+
+def board_url(gym):
+    """
+    Public URL of the gym's published board, for kiosks and CDN origins.
+    """
+    return default_storage.url(board_path(gym, "routes.html"))
+
+def anonymous_get(path):
+    """
+    A GET request for path as an anonymous visitor, complete enough for the
+    frontend templates and context processors.
+    """
+    request = HttpRequest()
+    request.method = "GET"
+    request.path = request.path_info = path
+    request.META = dict(SERVER_NAME=settings.BOARD_SNAPSHOT_HOST, SERVER_PORT='80')
+    request.user = AnonymousUser()
+    request.session = SessionBase()
+    request.resolver_match = urlresolvers.resolve(path)
+    return request
+
+def render_view(view, path):
+    request = anonymous_get(path)
+    response = view(request, *request.resolver_match.args, **request.resolver_match.kwargs)
+    response.render()
+    return response.content
+
+def write(name, content):
+    # S3 overwrites in place, so kiosks never see the file missing. Only
+    # FileSystemStorage would save under a new, suffixed name instead.
+    if isinstance(default_storage, FileSystemStorage) and default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+
+def board_json(gym, routes, cursor):
+    rows = [dict(changes.route_data(row, route), slug=row.slug) for row, route in zip(route_rows(routes, gym, url_name=None), routes)]
+    return json.dumps(dict(cursor=cursor, routes=rows))
+
+def routes_to_render(gym, published, cursor, live):
+    """
+    Slugs whose pages need rendering and slugs whose pages should go, worked
+    out from the change log since the last publish. Returns None when the
+    log no longer reaches back that far and everything must be rendered.
+    """
+    if published is None or published > cursor:
+        return None
+    entries = changes.changes_since(gym.pk, published, cursor - published)
+    if not entries or entries[0].seq != published + 1:
+        return None
+    touched = set(entry.route for entry in entries)
+    return touched & live, touched - live
+
+def publish_gym(gym, full=False):
+    """
+    Renders the gym's live board as routes.html and routes.json, plus a page
+    for every live route, into DEFAULT_FILE_STORAGE under
+    BOARD_SNAPSHOT_ROOT/<gym slug>/. After the first run only the pages of
+    routes in the change log since the previous publish are rendered again.
+    Returns the number of route pages written, or None when nothing changed.
+
+    routes.json carries the change feed cursor it was built from, so a
+    client can load it and then follow gym_changes from there.
+    """
+    # The cached sequence can run ahead of changes that have not committed yet.
+    cursor = changes.committed_seq(gym.pk)
+    published = None if full else cache.shared.get(PUBLISHED_KEY % gym.pk)
+    if published == cursor:
+        return None
+    routes = list(gym.routes.filter(status="complete").order_by("-date_set").select_related('setter'))
+    live = set(route.slug for route in routes)
+    pending = routes_to_render(gym, published, cursor, live)
+    if pending is None:
+        pages = board_path(gym, "routes")
+        existing = default_storage.listdir(pages)[1] if default_storage.exists(pages) else []
+        render = live
+        remove = set(name[:-len(".html")] for name in existing if name.endswith(".html")) - live
+    else:
+        render, remove = pending
+
+    routes_path = urlresolvers.reverse("gym_routes", kwargs=dict(gym=gym.slug))
+    write(board_path(gym, "routes.html"), render_view(RoutesPage.as_view(), routes_path))
+    write(board_path(gym, "routes.json"), board_json(gym, routes, cursor))
+    route_page = RoutePage.as_view(count_views=False)
+    for slug in render:
+        path = urlresolvers.reverse("gym_route", kwargs=dict(gym=gym.slug, route=slug))
+        write(board_path(gym, "routes/%s.html" % slug), render_view(route_page, path))
+    for slug in remove:
+        default_storage.delete(board_path(gym, "routes/%s.html" % slug))
+    cache.shared.set(PUBLISHED_KEY % gym.pk, cursor, None)
+    return len(render)
@@ -0,0 +1,52 @@
+from collections import namedtuple
+
+from django.core import urlresolvers
+
+RouteRow = namedtuple('RouteRow', 'slug name colors grade location setter setter_name score status flagged url')
+
+SLUG_PLACEHOLDER = "00000"
+
+def url_template(url_name, gym):
+    """
+    Reverses url_name once for the gym and returns a function that fills in
+    each route's slug, instead of resolving the pattern again for every row.
+    """
+    url = urlresolvers.reverse(url_name, kwargs=dict(gym=gym.slug, route=SLUG_PLACEHOLDER))
+    prefix, suffix = url.rsplit(SLUG_PLACEHOLDER, 1)
+    return lambda slug: prefix + slug + suffix
+
+def route_rows(routes, gym, url_name="gym_route"):
+    """
+    Flattens routes into RouteRows holding everything the route list templates
+    display, so the templates only interpolate values. Grade labels and setter
+    names are worked out once per distinct value rather than once per route.
+    """
+    url = url_template(url_name, gym) if url_name else None
+    grades = {}
+    setters = {}
+    rows = []
+    for route in routes:
+        # Routes from gym.routes already know their gym; make sure the grade
+        # lookup never goes back to the database for it.
+        route.gym = gym
+        key = (route.type, route.grade)
+        if key not in grades:
+            grades[key] = route.get_grade_display()
+        setter = route.setter
+        if setter is not None and setter.pk not in setters:
+            setters[setter.pk] = (setter.display(), unicode(setter))
+        setter_display, setter_name = setters[setter.pk] if setter is not None else ("", "")
+        rows.append(RouteRow(
+            slug=route.slug,
+            name=route.name,
+            colors=route.colors(),
+            grade=grades[key],
+            location=route.location,
+            setter=setter_display,
+            setter_name=setter_name,
+            score=getattr(route, 'score', None),
+            status=route.status,
+            flagged=route.open_flags > 0,
+            url=url(route.slug) if url else None,
+        ))
+    return rows
@@ -0,0 +1,60 @@
+import datetime
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Q
+
+from gyms.models import ArchivedRoute, GradeSnapshot, Route
+
+def route_intervals(gym, start, end):
+    """
+    Yields (key, first_day, last_day) for every route live at gym on any day
+    from start to end, where key is (type, grade, location) and last_day is
+    inclusive.
+    """
+    # The base managers skip the rating aggregates. Routes moved to the archive
+    # still count for the days they were up.
+    fields = ('type', 'grade', 'location', 'date_set', 'date_torn')
+    live = Q(date_torn__isnull=True) | Q(date_torn__gt=start)
+    rows = chain(*[model._base_manager.filter(live, gym=gym, status__in=Route.LIVE_STATUSES, date_set__lte=end).values_list(*fields)
+        for model in (Route, ArchivedRoute)])
+    for type, grade, location, date_set, date_torn in rows:
+        last_day = date_torn - datetime.timedelta(days=1) if date_torn else end
+        if last_day >= max(date_set, start):
+            yield (type, grade, location), date_set, last_day
+
+def daily_counts(gym, start, end):
+    """
+    Sweeps route set/torn events once and yields (day, Counter) for every day
+    from start to end, instead of querying the Route table per day.
+    """
+    deltas = defaultdict(Counter)
+    for key, first_day, last_day in route_intervals(gym, start, end):
+        deltas[max(first_day, start)][key] += 1
+        deltas[last_day + datetime.timedelta(days=1)][key] -= 1
+    counts = Counter()
+    day = start
+    while day <= end:
+        counts.update(deltas.pop(day, {}))
+        yield day, +counts
+        day += datetime.timedelta(days=1)
+
+@transaction.atomic
+def write_snapshots(gym, start, end):
+    GradeSnapshot.objects.filter(gym=gym, date__gte=start, date__lte=end).delete()
+    rows = []
+    for day, counts in daily_counts(gym, start, end):
+        for (type, grade, location), count in counts.items():
+            rows.append(GradeSnapshot(gym=gym, date=day, type=type, grade=grade, location=location, count=count))
+    GradeSnapshot.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+def first_route_day(gym):
+    """
+    The earliest date_set of any live, torn or archived route at gym, or None.
+    """
+    days = [model._base_manager.filter(gym=gym).order_by('date_set').values_list('date_set', flat=True)[:1]
+        for model in (Route, ArchivedRoute)]
+    days = [day[0] for day in days if day]
+    return min(days) if days else None
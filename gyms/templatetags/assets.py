@@ -0,0 +1,23 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+TAGS = {
+	'.css': '<link rel="stylesheet" href="{0}" type="text/css" />',
+	'.js': '<script src="{0}"></script>',
+}
+
+@register.simple_tag
+def static_bundle(name):
+	"""
+	Includes a bundle from STATIC_BUNDLES, or each of its source files while
+	bundling is off.
+	"""
+	tag = TAGS[name[name.rindex('.'):]]
+	if settings.STATIC_BUNDLES_ENABLED:
+		return format_html(tag, staticfiles_storage.url(name))
+	sources = settings.STATIC_BUNDLES[name]
+	return format_html_join('\n', tag, ((staticfiles_storage.url(path),) for path in sources))
@@ -1,3 +1,801 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import re
+import shutil
+import tempfile
+import time
+from io import BytesIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail, urlresolvers
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase
+from django.test.client import RequestFactory
+from django.utils import timezone
+
+from gyms import changes, leaderboards, printing, publish
+from gyms.forms import route_form_choices
+from gyms.lookup import GymCache
+from gyms.management.commands import build_recommendations
+from gyms.management.commands.profile_imports import profile_startup
+from gyms.middleware import CompressionMiddleware, PrimaryPinMiddleware, RequestTimingMiddleware
+from gyms.models import (ArchivedFavorite, ArchivedRating, ArchivedRoute, ArchivedRouteFlag, ArchivedSend,
+    Favorite, Rating, FeedBatch, GradeSnapshot, Gym, GymFollow, LeaderboardEntry, RecommendedRoute, Route, Send,
+    RouteFlag, SimilarRoute)
+from gyms.rows import route_rows
+from gyms.snapshots import write_snapshots
+from gyms.views import gym_directory_page
+from rockgympro.cache import LocalLRU, TieredCache, cache
+from rockgympro.ratelimit import take_token
+from rockgympro.routers import PIN_COOKIE, ReplicaRouter, read_from_replica
+from users.models import User
+
+
+class QueryPlanMixin(object):
+    """
+    Runs EXPLAIN on a queryset and fails if the plan contains a full table scan.
+    """
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        cursor = connection.cursor()
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN %s" % sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute("EXPLAIN %s" % sql, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, queryset):
+        for step in self.explain(queryset):
+            if connection.vendor == "sqlite":
+                full_scan = step.startswith("SCAN") and "INDEX" not in step
+            else:
+                full_scan = step.get("type") == "ALL"
+            self.assertFalse(full_scan, "Full table scan in plan: %s\n%s" % (step, queryset.query))
+
+
+class HotPathIndexTests(QueryPlanMixin, TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym", location_options="Cave\nSlab")
+        self.user = User.objects.create(username="climber")
+        self.route = Route.objects.create(gym=self.gym, grade=1004, location="Cave", setter=self.user)
+        Send.objects.create(route=self.route, user=self.user)
+        RouteFlag.objects.create(route=self.route, user=self.user, message="Loose hold")
+
+    def test_gym_by_slug(self):
+        self.assertNoFullScan(Gym.objects.filter(slug="testgym"))
+
+    def test_live_routes(self):
+        self.assertNoFullScan(self.gym.live_routes)
+
+    def test_routes_print(self):
+        today = datetime.date.today()
+        self.assertNoFullScan(self.gym.routes.filter(status="complete",
+            date_set__lte=today, date_set__gte=today - datetime.timedelta(weeks=1)))
+
+    def test_dashboard_sends(self):
+        self.assertNoFullScan(self.user.send_set.order_by("-created")[:10])
+
+    def test_open_flags(self):
+        self.assertNoFullScan(RouteFlag.objects.filter(route=self.route, active=True))
+
+    def test_flag_inbox(self):
+        self.assertNoFullScan(RouteFlag.objects.filter(route__gym=self.gym, active=True).order_by('-created'))
+
+    def test_open_flag_count(self):
+        self.assertNoFullScan(Route._base_manager.filter(gym=self.gym, open_flags__gt=0))
+
+
+@skipUnless(settings.DATABASE_REPLICAS, "run with DJANGO_SETTINGS_MODULE=rockgympro.settings_replica")
+class ReplicaRouterTests(TestCase):
+
+    multi_db = True
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        Gym.objects.create(name="Primary Gym", slug="primary")
+
+    def gym_slugs(self, request):
+        return HttpResponse(",".join(Gym.objects.values_list("slug", flat=True)))
+
+    def test_reads_go_to_replica(self):
+        response = read_from_replica(self.gym_slugs)(self.factory.get("/gyms/"))
+        self.assertEqual(response.content, "")
+
+    def test_nested_view_keeps_replica(self):
+        inner = read_from_replica(self.gym_slugs)
+
+        def outer(request):
+            inner(request)
+            return self.gym_slugs(request)
+        response = read_from_replica(outer)(self.factory.get("/gyms/"))
+        self.assertEqual(response.content, "")
+
+    def test_one_replica_per_request(self):
+        router = ReplicaRouter()
+
+        def aliases(request):
+            return HttpResponse(",".join(set(router.db_for_read(Gym) for i in range(20))))
+        with self.settings(DATABASE_REPLICAS=("replica1", "replica2", "replica3")):
+            response = read_from_replica(aliases)(self.factory.get("/gyms/"))
+        self.assertIn(response.content, ("replica1", "replica2", "replica3"))
+        self.assertEqual(router.db_for_read(Gym), "default")
+
+    def test_writes_read_from_primary(self):
+        response = read_from_replica(self.gym_slugs)(self.factory.post("/gyms/"))
+        self.assertEqual(response.content, "primary")
+
+    def test_pinned_client_reads_from_primary(self):
+        request = self.factory.get("/gyms/")
+        request.COOKIES[PIN_COOKIE] = str(time.time() + 60)
+        response = read_from_replica(self.gym_slugs)(request)
+        self.assertEqual(response.content, "primary")
+
+    def test_writes_pin_client(self):
+        middleware = PrimaryPinMiddleware()
+        response = middleware.process_response(self.factory.post("/gyms/"), HttpResponse())
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = middleware.process_response(self.factory.get("/gyms/"), HttpResponse())
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class TieredCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = TieredCache(max_entries=2)
+        self.cache.shared.clear()
+
+    def test_lru_evicts_oldest(self):
+        lru = LocalLRU(2)
+        lru.set("a", 1, 60)
+        lru.set("b", 2, 60)
+        lru.get("a")
+        lru.set("c", 3, 60)
+        self.assertEqual(lru.get("a"), 1)
+        self.assertEqual(lru.get("b"), None)
+
+    def test_get_or_set_computes_once(self):
+        calls = []
+        compute = lambda: calls.append(1) or "board"
+        self.assertEqual(self.cache.get_or_set("board", compute), "board")
+        self.assertEqual(self.cache.get_or_set("board", compute), "board")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.assertEqual(self.cache.stats()['local_hits'], 1)
+
+    def test_shared_hit_after_local_eviction(self):
+        self.cache.set("board", "value")
+        self.cache.local.clear()
+        self.assertEqual(self.cache.get("board"), "value")
+        self.assertEqual(self.cache.stats()['shared_hits'], 1)
+
+    def test_delete_clears_both_levels(self):
+        self.cache.set("board", "value")
+        self.cache.delete("board")
+        self.assertEqual(self.cache.get("board"), None)
+
+    def test_shared_stats_sum_workers(self):
+        other = TieredCache(max_entries=2)
+        self.cache.get("board")
+        other.set("board", "value")
+        other.get("board")
+        self.cache.counters.flush()
+        other.counters.flush()
+        stats = self.cache.shared_stats()
+        self.assertEqual((stats['misses'], stats['local_hits']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+
+class RouteDigestTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        self.climber = User.objects.create(username="climber", email="climber@example.com")
+        GymFollow.objects.create(gym=self.gym, user=self.climber)
+
+    def test_digest_sent_once(self):
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave")
+        Route.objects.create(gym=self.gym, grade=1006, location="Slab")
+        call_command("send_route_digests")
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["climber@example.com"])
+        self.assertIn("Cave", mail.outbox[0].body)
+        self.assertIn("Slab", mail.outbox[0].body)
+        call_command("send_route_digests")
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class CompressionMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = CompressionMiddleware()
+        self.body = '{"routes": [%s]}' % ", ".join(['{"grade": "5.10a"}'] * 100)
+
+    def request(self, accept="gzip, deflate"):
+        request = self.factory.get("/gyms/testgym/admin/stats.json", HTTP_ACCEPT_ENCODING=accept)
+        RequestTimingMiddleware().process_request(request)
+        return request
+
+    def gunzip(self, data):
+        return gzip.GzipFile(fileobj=BytesIO(data)).read()
+
+    def test_gzips_json(self):
+        request = self.request()
+        response = self.middleware.process_response(request, HttpResponse(self.body, content_type="application/json"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(self.gunzip(response.content), self.body)
+        self.assertIn("compress", request.timings)
+
+    def test_skips_unaccepted_small_and_binary(self):
+        response = self.middleware.process_response(self.request(accept="identity"), HttpResponse(self.body))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response = self.middleware.process_response(self.request(), HttpResponse("small"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response = self.middleware.process_response(self.request(), HttpResponse(self.body, content_type="application/pdf"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_streaming(self):
+        response = StreamingHttpResponse([self.body, self.body], content_type="text/html")
+        response = self.middleware.process_response(self.request(), response)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(self.gunzip("".join(response.streaming_content)), self.body * 2)
+
+
+class BulkRouteAddTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym", location_options="Cave\nSlab")
+
+    def test_bulk_add(self):
+        routes = [Route(gym=self.gym, grade=1004, location="Cave", status="complete") for i in range(30)]
+        Route.bulk_add(routes)
+        self.assertEqual(len(set(route.slug for route in routes)), 30)
+        self.assertEqual(Route.objects.filter(gym=self.gym).count(), 30)
+        self.assertEqual(FeedBatch.objects.get(gym=self.gym).route_count, 30)
+
+    def test_reset_location(self):
+        old = Route.objects.create(gym=self.gym, grade=1004, location="Cave")
+        other = Route.objects.create(gym=self.gym, grade=1004, location="Slab")
+        version = self.gym.routes_version()
+        torn = self.gym.reset_location("Cave", [Route(grade=1006, status="complete") for i in range(3)])
+        self.assertEqual(torn, 1)
+        self.assertEqual(Route.objects.get(slug=old.slug).status, "torn")
+        self.assertEqual(Route.objects.get(slug=other.slug).status, "complete")
+        self.assertEqual(self.gym.live_routes.filter(location="Cave").count(), 3)
+        self.assertEqual(self.gym.routes_version(), version + 1)
+
+
+class FlagCounterTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        self.user = User.objects.create(username="climber")
+        self.route = Route.objects.create(gym=self.gym, grade=1004, location="Cave")
+
+    def open_flags(self):
+        return Route.objects.get(slug=self.route.slug).open_flags
+
+    def test_counter(self):
+        first = self.route.add_flag(self.user, "Loose hold")
+        self.route.add_flag(self.user, "Spinning jug")
+        self.assertEqual(self.open_flags(), 2)
+        self.assertEqual(self.gym.open_flag_count(), 2)
+        first.dismiss()
+        first.dismiss()
+        self.assertEqual(self.open_flags(), 1)
+        self.route.dismiss_flags()
+        self.assertEqual(self.open_flags(), 0)
+        self.assertEqual(RouteFlag.objects.filter(route=self.route, active=False).count(), 2)
+
+    def test_save_keeps_counter(self):
+        self.route.add_flag(self.user, "Loose hold")
+        self.route.location = "Slab"
+        self.route.save()
+        self.assertEqual(self.open_flags(), 1)
+
+
+class GymCacheTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        self.cache = GymCache(check_interval=0)
+
+    def test_hits_after_first_lookup(self):
+        self.assertEqual(self.cache.get("testgym"), self.gym)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get("testgym").name, "Test Gym")
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_save_invalidates(self):
+        self.cache.get("testgym")
+        self.gym.name = "Renamed Gym"
+        self.gym.save()
+        self.assertEqual(self.cache.get("testgym").name, "Renamed Gym")
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_shared_stats(self):
+        self.cache.counters.reset()
+        self.cache.get("testgym")
+        self.cache.get("testgym")
+        self.cache.counters.flush()
+        stats = self.cache.shared_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_missing_gym(self):
+        self.assertRaises(Gym.DoesNotExist, self.cache.get, "nogym")
+
+
+class TokenBucketTests(TestCase):
+
+    def setUp(self):
+        cache.shared.clear()
+
+    def test_bucket_empties_and_refills(self):
+        now = time.time()
+        for i in range(3):
+            self.assertEqual(take_token("bucket", 3, 60, now=now), 0)
+        self.assertAlmostEqual(take_token("bucket", 3, 60, now=now), 20)
+        self.assertEqual(take_token("bucket", 3, 60, now=now + 20), 0)
+
+    def test_ajax_returns_429(self):
+        gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        user = User.objects.create(username="climber")
+        user.set_password("secret")
+        user.save()
+        self.client.login(username="climber", password="secret")
+        with self.settings(RATE_LIMITS={'gym:follow': (1, 60)}):
+            self.assertEqual(self.client.post("/testgym/follow/").status_code, 200)
+            response = self.client.post("/testgym/follow/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(cache.shared.get("ratelimit:rejected:gym:follow"), 1)
+
+
+class RouteChangeFeedTests(TransactionTestCase):
+    # The cached cursor is only written after a commit, which TestCase never does.
+
+    def setUp(self):
+        cache.shared.clear()
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+
+    def feed(self, **params):
+        return json.loads(self.client.get("/testgym/changes/", params).content)
+
+    def test_changes_since_cursor(self):
+        cursor = self.feed()['cursor']
+        route = Route.objects.create(gym=self.gym, grade=1004, location="Cave")
+        route.status = "torn"
+        route.save()
+        feed = self.feed(since=cursor)
+        self.assertEqual([change['kind'] for change in feed['changes']], ["created", "torn"])
+        self.assertEqual(feed['changes'][0]['route'], route.slug)
+        self.assertFalse(feed['reset'])
+        self.assertEqual(self.feed(since=feed['cursor'])['changes'], [])
+
+    def test_trimmed_changes_reset(self):
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave")
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave")
+        call_command('trim_route_changes', days=-1)
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave")
+        feed = self.feed(since=0)
+        self.assertEqual(feed['cursor'], 3)
+        self.assertTrue(feed['reset'])
+
+    def test_everything_trimmed_resets(self):
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave")
+        call_command('trim_route_changes', days=-1)
+        feed = self.feed(since=0, wait=5)
+        self.assertEqual(feed['cursor'], 1)
+        self.assertTrue(feed['reset'])
+
+    def test_bulk_add_moves_cursor_after_commit(self):
+        self.assertEqual(self.feed()['cursor'], 0)
+        Route.bulk_add([Route(gym=self.gym, grade=1004, location="Cave") for i in range(3)])
+        self.assertEqual(self.feed()['cursor'], 3)
+
+    def test_rollback_leaves_cursor(self):
+        cursor = self.feed()['cursor']
+        try:
+            with transaction.atomic():
+                Route.objects.create(gym=self.gym, grade=1004, location="Cave")
+                raise IntegrityError
+        except IntegrityError:
+            pass
+        self.assertEqual(self.feed()['cursor'], cursor)
+
+    def test_cursor_ahead_of_database_heals(self):
+        cursor = self.feed()['cursor']
+        cache.shared.set(changes.SEQ_KEY % self.gym.pk, cursor + 5, None)
+        feed = self.feed(since=cursor)
+        self.assertEqual((feed['cursor'], feed['changes'], feed['reset']), (cursor, [], False))
+        self.assertEqual(changes.latest_seq(self.gym.pk), cursor)
+
+    def test_rejects_wait_that_is_not_finite(self):
+        for wait in ("nan", "inf", "-inf"):
+            response = self.client.get("/testgym/changes/", dict(since=0, wait=wait))
+            self.assertEqual(response.status_code, 400)
+
+
+class BoardPublishTests(TestCase):
+
+    def setUp(self):
+        cache.shared.clear()
+        self.storage = FileSystemStorage(location=tempfile.mkdtemp())
+        self.default_storage, publish.default_storage = publish.default_storage, self.storage
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+
+    def tearDown(self):
+        publish.default_storage = self.default_storage
+        shutil.rmtree(self.storage.location)
+
+    def test_publishes_changed_routes(self):
+        first = Route.objects.create(gym=self.gym, grade=1004, location="Cave", status="complete")
+        self.assertEqual(publish.publish_gym(self.gym), 1)
+        board = json.loads(self.storage.open("boards/testgym/routes.json").read())
+        self.assertEqual([route['slug'] for route in board['routes']], [first.slug])
+        self.assertIsNone(publish.publish_gym(self.gym))
+
+        second = Route.objects.create(gym=self.gym, grade=1006, location="Slab", status="complete")
+        first.status = "torn"
+        first.save()
+        self.assertEqual(publish.publish_gym(self.gym), 1)
+        self.assertTrue(self.storage.exists("boards/testgym/routes/%s.html" % second.slug))
+        self.assertFalse(self.storage.exists("boards/testgym/routes/%s.html" % first.slug))
+
+    def test_cursor_ignores_uncommitted_changes(self):
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", status="complete")
+        committed = changes.committed_seq(self.gym.pk)
+        # As left by record() inside a transaction that has not committed yet.
+        cache.shared.set(changes.SEQ_KEY % self.gym.pk, committed + 5, None)
+        publish.publish_gym(self.gym)
+        self.assertEqual(cache.shared.get(publish.PUBLISHED_KEY % self.gym.pk), committed)
+        board = json.loads(self.storage.open("boards/testgym/routes.json").read())
+        self.assertEqual(board['cursor'], committed)
+
+    def test_rewrites_board_files_in_place(self):
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", status="complete")
+        publish.publish_gym(self.gym)
+        publish.publish_gym(self.gym, full=True)
+        self.assertEqual(sorted(self.storage.listdir("boards/testgym")[1]), ["routes.html", "routes.json"])
+
+
+class RoutePrintingTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym", named_routes=True)
+        self.user = User.objects.create(username="setter", name="Sam Setter")
+        for i in range(30):
+            Route.objects.create(gym=self.gym, grade=1004, location="Cave", setter=self.user,
+                name="Route %s" % i, color1="#ff0000", color2="#0000ff", status="complete")
+
+    def pages(self, draw, *args):
+        out = BytesIO()
+        draw(out, self.gym, self.gym.routes.select_related('setter').iterator(), *args)
+        pdf = out.getvalue()
+        self.assertTrue(pdf.startswith("%PDF"))
+        return len(re.findall(r"/Type /Page\b", pdf))
+
+    def test_route_list(self):
+        self.assertEqual(self.pages(printing.route_list_pdf, "Routes"), 2)
+
+    def test_wall_tags(self):
+        link = lambda slug: "http://testserver/testgym/routes/%s/" % slug
+        self.assertEqual(self.pages(printing.wall_tags_pdf, link), 4)
+
+
+class SendTests(TestCase):
+
+    def test_one_send_per_user_and_route(self):
+        gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        user = User.objects.create(username="climber")
+        route = Route.objects.create(gym=gym, grade=1004, location="Cave")
+        Send.objects.create(route=route, user=user)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Send.objects.create(route=route, user=user)
+
+
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        cache.shared.clear()
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        self.user = User.objects.create(username="climber")
+        self.user.set_password("secret")
+        self.user.save()
+        self.client.login(username="climber", password="secret")
+        self.easy = Route.objects.create(gym=self.gym, grade=1002, location="Cave", status="complete")
+        self.hard = Route.objects.create(gym=self.gym, grade=1006, location="Cave", status="complete")
+
+    def buckets(self):
+        return sorted(LeaderboardEntry.objects.filter(gym=self.gym).values_list('period', 'bucket', 'sends', 'hardest'))
+
+    def post(self, route, action):
+        return json.loads(self.client.post("/testgym/routes/%s/%s/" % (route.slug, action)).content)
+
+    def archive_send(self):
+        """
+        An archived send from last year, as archive_routes would leave it.
+        """
+        created = timezone.now() - datetime.timedelta(days=400)
+        old = ArchivedRoute.objects.create(slug="old01", created=created, edited=created, gym=self.gym,
+            type="bouldering", grade=1008, location="Cave", date_set=created.date(), status="torn")
+        ArchivedSend.objects.create(route=old, user=self.user, created=created, edited=created)
+
+    def test_repeated_send_counts_once(self):
+        self.assertTrue(self.post(self.easy, "send")['new'])
+        self.assertFalse(self.post(self.easy, "send")['new'])
+        self.assertEqual(Send.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(set(entry[2] for entry in self.buckets()), set([1]))
+
+    def test_unsend_keeps_archived_sends(self):
+        self.archive_send()
+        leaderboards.rebuild(self.gym)
+        self.post(self.easy, "send")
+        self.post(self.hard, "send")
+        self.post(self.hard, "unsend")
+        incremental = self.buckets()
+        all_time = [entry for entry in incremental if entry[0] == "all"]
+        self.assertEqual(all_time[0][2:], (2, 1008))
+        leaderboards.rebuild(self.gym)
+        self.assertEqual(self.buckets(), incremental)
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        cache.shared.clear()
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        self.user = User.objects.create(username="climber")
+        self.user.set_password("secret")
+        self.user.save()
+        self.route = Route.objects.create(gym=self.gym, grade=1005, location="Cave", name="Old Problem", status="torn")
+        Send.objects.create(route=self.route, user=self.user)
+        Favorite.objects.create(route=self.route, user=self.user)
+        Rating.objects.create(route=self.route, user=self.user, score=4)
+        self.route.add_flag(self.user, "Loose hold")
+        Route._base_manager.filter(slug=self.route.slug).update(date_torn=datetime.date.today() - datetime.timedelta(days=400))
+        call_command('archive_routes')
+
+    def test_rows_move_to_archive(self):
+        self.assertFalse(Route._base_manager.filter(slug=self.route.slug).exists())
+        for model in (Send, Favorite, Rating, RouteFlag):
+            self.assertFalse(model.objects.filter(route=self.route.slug).exists())
+        archived = ArchivedRoute.objects.get(slug=self.route.slug)
+        self.assertEqual((archived.gym, archived.grade, archived.location, archived.name),
+            (self.gym, self.route.grade, "Cave", "Old Problem"))
+        self.assertEqual(archived.score, 4)
+        for model in (ArchivedSend, ArchivedFavorite, ArchivedRating, ArchivedRouteFlag):
+            self.assertEqual(model.objects.filter(route=archived, user=self.user).count(), 1)
+
+    def test_urls_fall_back_to_archive(self):
+        self.assertEqual(self.client.get("/testgym/routes/%s/" % self.route.slug).status_code, 200)
+        self.assertEqual(self.client.get("/testgym/routes/%s/sends/" % self.route.slug).status_code, 200)
+
+    def test_logbook_lists_archived_send(self):
+        self.client.login(username="climber", password="secret")
+        response = self.client.get("/sends/")
+        self.assertEqual([entry.route.slug for entry in response.context['routes']], [self.route.slug])
+
+
+class RouteSearchTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        for grade in (1003, 1004, 1004.25, 1006, 1007):
+            Route.objects.create(gym=self.gym, grade=grade, location="Cave")
+        Route.objects.create(gym=self.gym, type="top_rope", grade=10, location="Slab")
+
+    def grades(self, **params):
+        params['format'] = "json"
+        response = json.loads(self.client.get("/testgym/routes/search/", params).content)
+        return [route['grade'] for route in response['routes']]
+
+    def test_grade_range_by_label(self):
+        self.assertEqual(self.grades(grade_min="V4", grade_max="V6"), ["V4", "V4+", "V6"])
+        self.assertEqual(self.grades(grade_min="5.10"), ["5.10"])
+        self.assertEqual(self.grades(type="top_rope", grade_max="V6"), [])
+
+
+class GradeSnapshotTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        self.day = datetime.date(2026, 1, 1)
+
+    def days(self, n):
+        return self.day + datetime.timedelta(days=n)
+
+    def counts(self):
+        return list(GradeSnapshot.objects.filter(gym=self.gym).order_by('date').values_list('date', 'count'))
+
+    def test_backfill_counts_each_live_day(self):
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", date_set=self.day, status="torn", date_torn=self.days(3))
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", date_set=self.days(2))
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", date_set=self.days(1), status="in_progress")
+        self.assertEqual(write_snapshots(self.gym, self.day, self.days(4)), 5)
+        self.assertEqual(self.counts(), [(self.days(0), 1), (self.days(1), 1), (self.days(2), 2), (self.days(3), 1), (self.days(4), 1)])
+
+    def test_routes_torn_before_the_day_are_not_counted(self):
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", date_set=self.day, status="torn", date_torn=self.days(3))
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", date_set=self.day)
+        write_snapshots(self.gym, self.days(10), self.days(10))
+        self.assertEqual(self.counts(), [(self.days(10), 1)])
+
+    def test_archived_routes_still_count(self):
+        now = timezone.now()
+        ArchivedRoute.objects.create(slug="archived", gym=self.gym, type="bouldering", grade=1004, location="Cave",
+            status="torn", date_set=self.day, date_torn=self.days(2), created=now, edited=now)
+        write_snapshots(self.gym, self.day, self.days(2))
+        self.assertEqual(self.counts(), [(self.days(0), 1), (self.days(1), 1)])
+
+
+class GymDirectoryTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        Gym.objects.create(name="Other Gym", slug="othergym")
+        today = datetime.date.today()
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", date_set=today - datetime.timedelta(days=10))
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", date_set=today - datetime.timedelta(days=3))
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", date_set=today - datetime.timedelta(days=20), status="torn")
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", date_set=today, status="in_progress")
+        for name in ("one", "two"):
+            GymFollow.objects.create(gym=self.gym, user=User.objects.create(username=name))
+        self.today = today
+
+    def test_counts(self):
+        page = gym_directory_page("", 1)
+        self.assertEqual([gym['slug'] for gym in page['gyms']], ["othergym", "testgym"])
+        other, gym = page['gyms']
+        self.assertEqual((gym['live_route_count'], gym['follower_count']), (2, 2))
+        # extra() columns skip the field converters, so sqlite hands back a string.
+        self.assertEqual(str(gym['last_date_set']), self.today.isoformat())
+        self.assertEqual((other['live_route_count'], other['follower_count'], other['last_date_set']), (0, 0, None))
+
+    def test_prefix(self):
+        page = gym_directory_page("te", 1)
+        self.assertEqual([gym['name'] for gym in page['gyms']], ["Test Gym"])
+
+
+class SetterReportTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        self.start = datetime.date(2026, 3, 1)
+        sam = User.objects.create(username="sam", name="Sam Setter")
+        alex = User.objects.create(username="alex")
+        climber = User.objects.create(username="climber")
+        day = self.start + datetime.timedelta(days=2)
+        self.routes = routes = [Route.objects.create(gym=self.gym, grade=grade, location="Cave", setter=sam, date_set=day)
+            for grade in (1004, 1004, 1006)]
+        Route.objects.create(gym=self.gym, type="top_rope", grade=10, location="Slab", setter=alex, date_set=day)
+        # Outside the window.
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", setter=alex, date_set=self.start - datetime.timedelta(days=1))
+        Rating.objects.create(route=routes[0], user=climber, score=3)
+        Rating.objects.create(route=routes[1], user=climber, score=4)
+        RouteFlag.objects.create(route=routes[2], user=climber, message="Loose hold")
+        # Not up on the wall yet.
+        unfinished = Route.objects.create(gym=self.gym, grade=1004, location="Cave", setter=sam, date_set=day, status="in_progress")
+        Rating.objects.create(route=unfinished, user=climber, score=1)
+        RouteFlag.objects.create(route=unfinished, user=climber, message="Not done")
+
+    def report(self):
+        return self.gym.setter_report(self.start, self.start + datetime.timedelta(days=13))
+
+    def test_report(self):
+        sam, alex = self.report()
+        v4, v6 = [Route(gym=self.gym, grade=grade).get_grade_display() for grade in (1004, 1006)]
+        self.assertEqual(sam['setter'], "Sam Setter")
+        self.assertEqual((sam['routes'], sam['per_week']), (3, 1.5))
+        self.assertEqual(sam['grades'], {"Bouldering": {v4: 2, v6: 1}})
+        self.assertEqual((sam['score'], sam['ratings']), (3.5, 2))
+        self.assertEqual((sam['flags'], sam['flag_rate']), (1, 0.333))
+        self.assertEqual(alex['setter'], "alex")
+        self.assertEqual((alex['routes'], alex['score'], alex['flags'], alex['flag_rate']), (1, None, 0, 0.0))
+        self.assertEqual(list(alex['grades']), ["Top Rope"])
+
+    def test_archived_routes_still_count(self):
+        before = self.report()
+        torn = [self.routes[0].slug, self.routes[2].slug]
+        Route._base_manager.filter(slug__in=torn).update(status="torn", date_torn=self.start + datetime.timedelta(days=5))
+        call_command('archive_routes', days=-1, stdout=BytesIO())
+        self.assertEqual(sorted(ArchivedRoute.objects.values_list('slug', flat=True)), sorted(torn))
+        self.assertEqual(self.report(), before)
+
+
+@skipUnless(build_recommendations.np, "build_recommendations requires numpy and scipy")
+class RecommendationTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        self.a, self.b, self.c = [Route.objects.create(gym=self.gym, grade=1004, location="Cave") for i in range(3)]
+        self.users = [User.objects.create(username="climber%s" % i) for i in range(4)]
+        # The first two climbers sent both a and b, the third only a, the last only c.
+        for user, route in [(0, self.a), (0, self.b), (1, self.a), (1, self.b), (2, self.a), (3, self.c)]:
+            Send.objects.create(route=route, user=self.users[user])
+        call_command('build_recommendations', stdout=BytesIO())
+
+    def similar(self, route):
+        return list(SimilarRoute.objects.filter(route=route).order_by('rank').values_list('similar', flat=True))
+
+    def test_co_sent_routes_are_similar(self):
+        self.assertEqual(self.similar(self.a), [self.b.slug])
+        self.assertEqual(self.similar(self.b), [self.a.slug])
+        self.assertEqual(self.similar(self.c), [])
+        score = SimilarRoute.objects.get(route=self.a).score
+        self.assertAlmostEqual(score, 2 / 6 ** 0.5)
+
+    def test_recommends_only_unclimbed_routes(self):
+        self.assertEqual(list(RecommendedRoute.objects.values_list('user', 'route', 'rank')),
+            [(self.users[2].pk, self.b.slug, 0)])
+
+
+class StartupImportTests(TestCase):
+
+    def test_pdf_stack_loads_lazily(self):
+        # profile_startup loads the WSGI app and URL conf in a fresh interpreter,
+        # since this module has already imported gyms.printing.
+        modules = profile_startup()['modules']
+        self.assertIn('gyms.views', modules)
+        slow = [name for name in modules if name.split('.')[0] in ('easy_pdf', 'xhtml2pdf', 'reportlab')]
+        self.assertEqual(slow, [])
+
+
+class RouteRowTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        setter = User.objects.create(username="setter", name="Sam Setter")
+        Route.objects.create(gym=self.gym, grade=1004, location="Cave", setter=setter, color1="#d11f2d")
+        Route.objects.create(gym=self.gym, grade=1006, location="Cave", setter=setter)
+        Route.objects.create(gym=self.gym, type="top_rope", grade=10, location="Slab")
+
+    def test_rows(self):
+        routes = list(self.gym.routes.select_related('setter').order_by('type', 'grade'))
+        with self.assertNumQueries(0):
+            rows = route_rows(routes, self.gym)
+        for row, route in zip(rows, routes):
+            fresh = Route.objects.get(slug=route.slug)
+            self.assertEqual(row.grade, fresh.get_grade_display())
+            self.assertEqual(row.url, urlresolvers.reverse("gym_route", kwargs=dict(gym="testgym", route=route.slug)))
+        v4, v6, top_rope = rows
+        self.assertNotEqual(v4.grade, v6.grade)
+        self.assertEqual((v4.colors, v4.setter, v4.setter_name), (["#d11f2d"], "SS", "Sam Setter"))
+        self.assertEqual((top_rope.setter, top_rope.setter_name, top_rope.flagged), ("", "", False))
+
+    def test_without_urls(self):
+        rows = route_rows(self.gym.routes.all(), self.gym, url_name=None)
+        self.assertEqual([row.url for row in rows], [None] * 3)
+
+
+class RouteFormChoicesTests(TestCase):
+
+    def setUp(self):
+        self.gym = Gym.objects.create(name="Test Gym", slug="testgym")
+        self.setter = User.objects.create(username="sam", name="Sam Setter", gym=self.gym, level=1000)
+
+    def setters(self):
+        return [label for pk, label in route_form_choices(Gym.objects.get(pk=self.gym.pk))['setter'] if pk]
+
+    def test_staff_changes_rebuild_choices(self):
+        self.assertEqual(self.setters(), ["Sam Setter"])
+        User.objects.create(username="alex", name="Alex Setter", gym=self.gym, level=1000)
+        self.assertEqual(sorted(self.setters()), ["Alex Setter", "Sam Setter"])
+        self.setter.name = "Samantha Setter"
+        self.setter.save()
+        self.assertEqual(sorted(self.setters()), ["Alex Setter", "Samantha Setter"])
+
+    def test_other_user_changes_keep_gym_edited(self):
+        edited = Gym.objects.get(pk=self.gym.pk).edited
+        self.setter.email = "sam@example.com"
+        self.setter.save()
+        self.assertEqual(Gym.objects.get(pk=self.gym.pk).edited, edited)
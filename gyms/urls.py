@@ -5,6 +5,9 @@ urlpatterns = patterns('',
     url(r'^$', GymPage.as_view(), name='gym_page'),
     url(r'^(?P<action>follow|unfollow)/$', GymAJAX.as_view(), name='gym_ajax'),
     url(r'^routes/$', RoutesPage.as_view(), name='gym_routes'),
+    url(r'^changes/$', RouteChanges.as_view(), name='gym_changes'),
+    url(r'^leaderboard/$', GymLeaderboard.as_view(), name='gym_leaderboard'),
+    url(r'^routes/search/$', RouteSearch.as_view(), name='gym_route_search'),
     url(r'^routes/(?P<route>\w{5})/$', RoutePage.as_view(), name='gym_route'),
     url(r'^routes/(?P<route>\w{5})/sends/$', RouteSendList.as_view(), name='gym_route_sends'),
     url(r'^routes/(?P<route>\w{5})/(?P<action>send|unsend|favorite|unfavorite|rate|flag)/$', RouteAJAX.as_view(), name='gym_route_ajax'),
@@ -12,9 +15,14 @@ urlpatterns = patterns('',
     url(r'^admin/routes/(?P<route>\w{5})/$', AdminRouteEdit.as_view(), name='gym_route_edit'),
     url(r'^admin/routes/(?P<route>\w{5})/dismissflags/$', DismissFlags.as_view(), name='dismiss_flags'),
     url(r'^admin/$', GymDashboard.as_view(), name='gym_dashboard'),
+    url(r'^admin/flags/$', FlagInbox.as_view(), name='gym_flags'),
+    url(r'^admin/flags/(?P<flag>\d+)/dismiss/$', DismissFlag.as_view(), name='dismiss_flag'),
     url(r'^admin/login/$', login, dict(template_name="login.html", authentication_form=GymAuthForm), name='gym_login'),
     url(r'^admin/stats.json$', GymStats.as_view(), name='gym_stats'),
+    url(r'^admin/trends.json$', GymGradeTrends.as_view(), name='gym_trends'),
+    url(r'^admin/setters/$', SetterReport.as_view(), name='gym_setter_report'),
     url(r'^admin/routes/add/$', AdminRouteAdd.as_view(), name='gym_route_add'),
+    url(r'^admin/routes/add/bulk/$', AdminRouteBulkAdd.as_view(), name='gym_route_bulk_add'),
     url(r'^admin/routes/$', AdminRoutesPage.as_view(), name="gym_routes_admin"),
     url(r'^admin/staff/$', AdminStaffPage.as_view(), name="gym_staff_admin"),
     url(r'^admin/staff/add/$', AdminEmployeeAdd.as_view(), name="gym_staff_add"),
@@ -24,24 +24,78 @@ from django.utils.translation import ugettext as _
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.debug import sensitive_post_parameters
-from django.views.generic import ListView, DetailView, View
+from django.views.generic import ListView, DetailView, TemplateView, View
 from django.views.generic.base import ContextMixin
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic.edit import FormView
 from gyms.forms import *
 from gyms.models import *
 import datetime
+import math
+import time
+from collections import Counter
+from django.db.models import Avg, F, Q, Sum
 from users.models import *
 from django.contrib import messages
-import easy_pdf.rendering
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from gyms import changes, leaderboards
+from gyms.archive import archived_route
+from gyms.lookup import gym_cache
+from gyms.rows import route_rows, url_template
+from rockgympro.cache import cache
+from rockgympro.ratelimit import RateLimitMixin
+from rockgympro.routers import read_from_replica, ReplicaReadMixin
+
+def pdf_response(filename):
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = 'inline; filename="%s"' % filename
+    return response
+
+def parse_date(value, default=None):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return default
 
 def about(request):
     return render(request, "about.html")
 
+GYMS_PER_PAGE = 25
+
+def gym_directory_page(prefix, page):
+    gyms = Gym.objects.order_by("name")
+    if prefix:
+        gyms = gyms.filter(name__istartswith=prefix)
+    gyms = gyms.extra(select=Gym.DIRECTORY_COUNTS, select_params=(datetime.date.today(),))
+    paginator = Paginator(gyms.values('slug', 'name', *Gym.DIRECTORY_COUNTS.keys()), GYMS_PER_PAGE)
+    try:
+        page = paginator.page(page)
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+    return dict(
+        gyms=list(page.object_list),
+        number=page.number,
+        num_pages=paginator.num_pages,
+        has_previous=page.has_previous(),
+        has_next=page.has_next(),
+    )
+
+@read_from_replica
 def gym_list(request):
-    context = dict(gyms=Gym.objects.all().order_by("name"))
+    prefix = request.GET.get("prefix", "")[:32]
+    number = request.GET.get("page", 1)
+    key = "gym_directory:%s:%s" % (urlquote(prefix.lower()), urlquote(number))
+    context = dict(page=cache.get_or_set(key, lambda: gym_directory_page(prefix, number), 60), prefix=prefix)
     return render(request, "gyms_list.html", context)
 
+def get_gym_or_404(slug):
+    try:
+        return gym_cache.get(slug)
+    except Gym.DoesNotExist:
+        raise Http404("No gym matches %s." % slug)
+
 class GymFinderMixin(ContextMixin):
 
     perms = None
@@ -52,7 +106,7 @@ class GymFinderMixin(ContextMixin):
         try:
             return self._gym
         except AttributeError:
-            self._gym = get_object_or_404(Gym, slug=self.kwargs['gym'])
+            self._gym = get_gym_or_404(self.kwargs['gym'])
             return self._gym
 
     def dispatch(self, request, *args, **kwargs):
@@ -101,11 +155,13 @@ class JSONResponseMixin(object):
     def render_to_response(self, context, **response_kwargs):
         return self.render_to_json_response(context, **response_kwargs)
 
-class GymPage(GymFinderMixin, DetailView):
+class GymPage(ReplicaReadMixin, GymFinderMixin, DetailView):
 
     template_name="gym_page.html"
 
-class GymAJAX(JSONResponseMixin, GymFinderMixin, View):
+class GymAJAX(RateLimitMixin, JSONResponseMixin, GymFinderMixin, View):
+
+    rate_limit_scope = "gym"
 
     def post(self, request, *args, **kwargs):
         gym = self.gym
@@ -124,9 +180,59 @@ class GymAJAX(JSONResponseMixin, GymFinderMixin, View):
             GymFollow.objects.filter(user=user, gym=gym).delete()
             return self.render_to_response(dict(success=True))
 
-class RoutesPage(GymFinderMixin, ListView):
+class RouteChanges(JSONResponseMixin, GymFinderMixin, View):
+    """
+    Route changes after the ?since= cursor, for boards that keep their own
+    copy of the route list. Without since only the current cursor is
+    returned. With ?wait=<seconds> the request is held until something
+    changes, checking the cached cursor about once a second, so an idle
+    poll never reaches the change table. reset is true when the changes
+    after since have been trimmed and the client should reload the board.
+    """
+    limit = 500
+
+    def get(self, request, *args, **kwargs):
+        gym_id = self.gym.pk
+        try:
+            since = int(request.GET['since'])
+            wait = float(request.GET.get('wait', 0))
+        except KeyError:
+            return self.render_to_response(dict(cursor=changes.latest_seq(gym_id), changes=[], reset=False))
+        except ValueError:
+            return self.render_to_response(dict(success=False), status=400)
+        if math.isnan(wait) or math.isinf(wait):
+            return self.render_to_response(dict(success=False), status=400)
+        deadline = time.time() + max(0.0, min(wait, settings.ROUTE_CHANGES_MAX_WAIT))
+        while True:
+            latest = changes.latest_seq(gym_id)
+            if latest < since:
+                # A cursor from the future; the client's copy can't be trusted.
+                return self.render_to_response(dict(cursor=latest, changes=[], reset=True))
+            if latest > since:
+                entries = changes.changes_since(gym_id, since, self.limit)
+                if entries:
+                    break
+                # Nothing after since although the cursor moved on: either the
+                # entries were trimmed, or the cached cursor was left ahead of
+                # the database by a rollback and is put back here.
+                committed = changes.committed_seq(gym_id)
+                if committed > since:
+                    return self.render_to_response(dict(cursor=committed, changes=[], reset=True))
+                if committed < latest:
+                    changes.cache_seq(gym_id, committed)
+            if time.time() >= deadline:
+                return self.render_to_response(dict(cursor=since, changes=[], reset=False))
+            time.sleep(min(1, max(0, deadline - time.time())))
+        return self.render_to_response(dict(
+            cursor=entries[-1].seq,
+            changes=[dict(seq=entry.seq, kind=entry.kind, route=entry.route, data=json.loads(entry.data)) for entry in entries],
+            reset=entries[0].seq != since + 1,
+        ))
+
+class RoutesPage(ReplicaReadMixin, GymFinderMixin, ListView):
 
     template_name = "gym_routes.html"
+    row_url = "gym_route"
     sorts = {
         "-date_set":"Most Recent",
         "grade":"Difficulty",
@@ -144,16 +250,132 @@ class RoutesPage(GymFinderMixin, ListView):
         context = super(RoutesPage, self).get_context_data(**kwargs)
         context['sort'] = self.get_sort()
         context['sort_name'] = self.sorts[self.get_sort()]
+        context['rows'] = route_rows(context['object_list'], self.gym, self.row_url)
         return context
 
     def get_queryset(self):
         return self.gym.routes.filter(status="complete").order_by(self.get_sort()).select_related('setter')
 
+class RouteSearch(ReplicaReadMixin, GymFinderMixin, ListView, JSONResponseMixin):
+    """
+    Live routes filtered by grade range, type, color, location, setter, date set
+    and name, with facet counts for each dimension from one grouped query.
+    """
+
+    template_name = "gym_route_search.html"
+
+    def filter_routes(self, routes):
+        GET = self.request.GET
+        if GET.get("type"):
+            routes = routes.filter(type=GET["type"])
+        if GET.get("grade_min") or GET.get("grade_max"):
+            routes = routes.filter(self.grade_range(GET.get("type"), GET.get("grade_min"), GET.get("grade_max")))
+        if GET.get("color"):
+            color = GET["color"]
+            routes = routes.filter(Q(color1=color) | Q(color2=color) | Q(color3=color))
+        if GET.get("location"):
+            routes = routes.filter(location=GET["location"])
+        if GET.get("setter", "").isdigit():
+            routes = routes.filter(setter=GET["setter"])
+        set_after = parse_date(GET.get("set_after"))
+        if set_after:
+            routes = routes.filter(date_set__gte=set_after)
+        set_before = parse_date(GET.get("set_before"))
+        if set_before:
+            routes = routes.filter(date_set__lte=set_before)
+        if GET.get("q"):
+            routes = routes.filter(name__icontains=GET["q"])
+        return routes
+
+    def grade_range(self, type, grade_min, grade_max):
+        """
+        Q for routes graded from the grade_min label to the grade_max label in
+        the gym's scale for each route type, or for every type when type is
+        empty. Types whose scale lacks either label are left out.
+        """
+        query = Q(pk__in=[])
+        for type in [type] if type else [key for key, name in Route.TYPE_CHOICES]:
+            format = getattr(self.gym, "%s_format" % type, None)
+            try:
+                low = grade_bounds(format, grade_min)[0] if grade_min else None
+                high = grade_bounds(format, grade_max)[1] if grade_max else None
+            except KeyError:
+                continue
+            bounds = Q(type=type)
+            if low is not None:
+                bounds &= Q(grade__gt=low)
+            if high is not None:
+                bounds &= Q(grade__lte=high)
+            query |= bounds
+        return query
+
+    def grade_scales(self):
+        """
+        (type name, labels) for the grade range pickers, in grade order.
+        """
+        return [(name, [label for value, label in sorted(rating_scales[getattr(self.gym, "%s_format" % type)])])
+            for type, name in Route.TYPE_CHOICES]
+
+    def get_queryset(self):
+        routes = self.gym.routes.filter(status="complete").order_by("grade").select_related('setter')
+        return self.filter_routes(routes)
+
+    def get_facets(self):
+        # The base manager skips RouteManager's rating aggregate.
+        routes = self.filter_routes(Route._base_manager.filter(gym=self.gym, status="complete"))
+        counts = dict(type=Counter(), grade=Counter(), color=Counter(), location=Counter(), setter=Counter())
+        for row in routes.values('type', 'grade', 'location', 'setter', 'color1', 'color2', 'color3').annotate(count=Count('slug')):
+            counts['type'][row['type']] += row['count']
+            counts['grade'][(row['type'], row['grade'])] += row['count']
+            counts['location'][row['location']] += row['count']
+            counts['setter'][row['setter']] += row['count']
+            for color in set([row['color1'], row['color2'], row['color3']]) - set(["#ffffff"]):
+                counts['color'][color] += row['count']
+
+        types = dict(Route.TYPE_CHOICES)
+        colors = dict(Route.COLOR_CHOICES)
+        setters = dict((user.id, user.display()) for user in get_user_model().objects.filter(id__in=[k for k in counts['setter'] if k]))
+        grades = OrderedDict()
+        for (type, grade), count in sorted(counts['grade'].items()):
+            label = Route(gym=self.gym, grade=grade, type=type).get_grade_display()
+            facet = grades.setdefault((type, label), dict(value=label, label=label, type=type, count=0))
+            facet['count'] += count
+        return dict(
+            type=[dict(value=k, label=types.get(k, k), count=v) for k,v in sorted(counts['type'].items())],
+            grade=grades.values(),
+            color=[dict(value=k, label=colors.get(k, k), count=v) for k,v in counts['color'].most_common()],
+            location=[dict(value=k, label=k, count=v) for k,v in sorted(counts['location'].items())],
+            setter=[dict(value=k, label=setters.get(k, "Unknown"), count=v) for k,v in counts['setter'].most_common()],
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super(RouteSearch, self).get_context_data(**kwargs)
+        context['facets'] = self.get_facets()
+        context['grade_scales'] = self.grade_scales()
+        context['query'] = self.request.GET
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get("format") != "json":
+            return super(RouteSearch, self).render_to_response(context, **response_kwargs)
+        routes = [dict(
+            slug=route.slug,
+            name=route.name,
+            type=route.type,
+            grade=route.get_grade_display(),
+            colors=route.colors(),
+            location=route.location,
+            setter=route.setter.display() if route.setter else None,
+            date_set=route.date_set.isoformat(),
+        ) for route in context['object_list']]
+        return self.render_to_json_response(dict(routes=routes, facets=context['facets']))
+
 class AdminRoutesPage(RoutesPage):
 
     perms = "admin_view"
 
     template_name = "gym_routes_admin.html"
+    row_url = "gym_route_edit"
 
     def get_queryset(self):
         return self.gym.routes.order_by(self.get_sort()).select_related('setter')
@@ -177,15 +399,18 @@ class AdminRoutesPage(RoutesPage):
             messages.success(request, "Routes successfully torn")
         elif "_dismiss" in request.POST:
             for route in routes:
-                route.routeflag_set.all().delete()
+                route.dismiss_flags()
             messages.success(request,"Route notifications dismissed")
         elif "_delete" in request.POST:
             for route in routes:
                 route.delete()
             messages.success(request,"Routes Deleted")
         elif "_print" in request.POST:
-            context = {"routes": routes, "gym": self.gym}
-            return easy_pdf.rendering.render_to_pdf_response(request, "routes_list_print.html", context)
+            # reportlab is slow to import, so only printing pays for it.
+            from gyms.printing import route_list_pdf
+            response = pdf_response("routes.pdf")
+            route_list_pdf(response, self.gym, routes)
+            return response
         return shortcuts.redirect(request.path)
 
 class RoutesPrint(GymFinderMixin, FormView):
@@ -194,21 +419,70 @@ class RoutesPrint(GymFinderMixin, FormView):
     form_class = PrintForm
 
     def form_valid(self, form):
+        from gyms import printing
+        data = form.cleaned_data
         routes = self.gym.routes.filter(status="complete",
-            date_set__lte=form.cleaned_data['end'],
-            date_set__gte=form.cleaned_data['start'],
-            )
-        context = {"routes": routes, "gym": self.gym, 'start': form.cleaned_data['start'], 'end': form.cleaned_data['end']}
-        return easy_pdf.rendering.render_to_pdf_response(self.request, "routes_list_print.html", context)
+            date_set__lte=data['end'],
+            date_set__gte=data['start'],
+            ).order_by('location', 'grade').select_related('setter').iterator()
+        if data['layout'] == "tags":
+            response = pdf_response("tags.pdf")
+            link = None
+            if data['qr_codes']:
+                url = url_template("gym_route", self.gym)
+                link = lambda slug: self.request.build_absolute_uri(url(slug))
+            printing.wall_tags_pdf(response, self.gym, routes, link)
+        else:
+            response = pdf_response("routes.pdf")
+            title = "Routes set between %s and %s" % (data['start'], data['end'])
+            printing.route_list_pdf(response, self.gym, routes, title)
+        return response
+
+class GymLeaderboard(ReplicaReadMixin, GymFinderMixin, TemplateView):
+
+    template_name = "gym_leaderboard.html"
+
+    def get_context_data(self, **kwargs):
+        context = super(GymLeaderboard, self).get_context_data(**kwargs)
+        periods = dict(LeaderboardEntry.PERIOD_CHOICES)
+        types = dict(Route.TYPE_CHOICES)
+        period = self.request.GET.get("period", "month")
+        period = period if period in periods else "month"
+        type = self.request.GET.get("type", "bouldering")
+        type = type if type in types else "bouldering"
+        context['period'] = period
+        context['period_name'] = periods[period]
+        context['type'] = type
+        context['type_name'] = types[type]
+        context['periods'] = LeaderboardEntry.PERIOD_CHOICES
+        context['types'] = Route.TYPE_CHOICES
+        context['top_climbers'] = leaderboards.leaderboard(self.gym, type, period, '-sends')
+        hardest = list(leaderboards.leaderboard(self.gym, type, period, '-hardest'))
+        labels = {}
+        for entry in hardest:
+            if entry.hardest not in labels:
+                labels[entry.hardest] = Route(gym=self.gym, grade=entry.hardest, type=type).get_grade_display()
+            entry.hardest_display = labels[entry.hardest]
+        context['hardest_sends'] = hardest
+        return context
 
 class RouteFinderMixin(GymFinderMixin):
 
+    # Whether the view also resolves routes moved to the archive tables.
+    allow_archived = False
+
     @property 
     def route(self):
         try:
             return self._route
         except AttributeError:
-            self._route = get_object_or_404(self.gym.routes, slug=self.kwargs['route'])
+            try:
+                route = self.gym.routes.get(slug=self.kwargs['route'])
+            except Route.DoesNotExist:
+                route = archived_route(self.gym, self.kwargs['route']) if self.allow_archived else None
+                if route is None:
+                    raise Http404
+            self._route = route
             return self._route
 
     def get_context_data(self, **kwargs):
@@ -226,23 +500,38 @@ class RouteFinderMixin(GymFinderMixin):
     def get_object(self):
         return self.route
 
-class RoutePage(RouteFinderMixin, DetailView):
+class RoutePage(ReplicaReadMixin, RouteFinderMixin, DetailView):
 
     template_name = "gym_route.html"
+    allow_archived = True
+    # Off when rendering a published snapshot rather than serving a visitor.
+    count_views = True
 
     def get_object(self):
         route = super(RoutePage, self).get_object()
-        route.views += 1
-        route.save()
+        if self.count_views:
+            # Count the view without a full save, which would log a route change
+            # and invalidate the gym's route caches on every page view.
+            type(route)._base_manager.filter(pk=route.pk).update(views=F('views') + 1)
+            route.views += 1
         return route
 
+    def get_context_data(self, **kwargs):
+        context = super(RoutePage, self).get_context_data(**kwargs)
+        if not self.route.is_archived:
+            context['similar_routes'] = [x.similar for x in self.route.similar_routes.order_by('rank').select_related('similar')[:5]]
+        return context
+
 class RouteSendList(RouteFinderMixin, ListView):
     template_name = "gym_route_sends.html"
+    allow_archived = True
 
     def get_queryset(self):
         return self.route.send_set.order_by("-created")
 
-class RouteAJAX(JSONResponseMixin, RouteFinderMixin, View):
+class RouteAJAX(RateLimitMixin, JSONResponseMixin, RouteFinderMixin, View):
+
+    rate_limit_scope = "route"
 
     def post(self, request, *args, **kwargs):
         route = self.route
@@ -250,13 +539,16 @@ class RouteAJAX(JSONResponseMixin, RouteFinderMixin, View):
         if user.is_anonymous():
             raise Http404
         elif kwargs['action'] == "send":
-            try:
-                Send(route=route, user=user).save()
-            except IntegrityError:
+            send, created = Send.objects.get_or_create(route=route, user=user)
+            if not created:
                 return self.render_to_response(dict(success=True, new=False))
+            leaderboards.add_send(send)
             return self.render_to_response(dict(success=True, new=True))
         elif kwargs['action'] == "unsend":
-            Send.objects.filter(user=user, route=route).delete()
+            sends = list(Send.objects.filter(user=user, route=route))
+            Send.objects.filter(id__in=[send.id for send in sends]).delete()
+            for send in sends:
+                leaderboards.remove_send(send)
             return self.render_to_response(dict(success=True))
         elif kwargs['action'] == "favorite":
             try:
@@ -275,11 +567,13 @@ class RouteAJAX(JSONResponseMixin, RouteFinderMixin, View):
                 return self.render_to_response(dict(success=False))
             else:
                 Rating(user=user, route=route, score=score).save()
+            average = Rating.objects.filter(route=route).aggregate(score=Avg('score'))['score']
+            changes.record_score(route, average)
             return self.render_to_response(dict(success=True))
         elif kwargs['action'] == 'flag':
             message = json.loads(request.body)['message']
             if len(message) <= 1000:
-                RouteFlag(user=user, route=route, message = message).save()
+                route.add_flag(user, message)
                 return self.render_to_response(dict(success=True))
             else:
                 return self.render_to_response(dict(success=False))
@@ -289,9 +583,39 @@ class DismissFlags(RouteFinderMixin, View):
     perms = "routes_manage"
 
     def post(self, request, *args, **kwargs):
-        self.route.routeflag_set.all().delete()
+        self.route.dismiss_flags()
         return shortcuts.redirect("gym_route_edit", gym=self.gym.slug, route=self.route.slug)
 
+class FlagInbox(GymFinderMixin, ListView):
+    """
+    Every open flag at the gym, newest first, with its route and reporter.
+    """
+
+    perms = "routes_manage"
+    template_name = "gym_flags.html"
+    paginate_by = 25
+
+    def get_queryset(self):
+        return RouteFlag.objects.filter(route__gym=self.gym, active=True) \
+            .select_related('route', 'route__gym', 'route__setter', 'user').order_by('-created')
+
+    def get_context_data(self, **kwargs):
+        context = super(FlagInbox, self).get_context_data(**kwargs)
+        context['open_flags'] = self.gym.open_flag_count()
+        return context
+
+class DismissFlag(GymFinderMixin, View):
+
+    perms = "routes_manage"
+
+    def post(self, request, *args, **kwargs):
+        flag = get_object_or_404(RouteFlag, id=kwargs['flag'], route__gym=self.gym)
+        flag.dismiss()
+        next = request.POST.get("next", "")
+        if not is_safe_url(url=next, host=request.get_host()):
+            next = urlresolvers.reverse("gym_flags", kwargs=dict(gym=self.gym.slug))
+        return shortcuts.redirect(next)
+
 class GymDashboard(GymPage):
 
     perms = "admin_view"
@@ -301,9 +625,10 @@ class GymDashboard(GymPage):
     def get_context_data(self, **kwargs):
         context = super(GymDashboard, self).get_context_data(**kwargs)
         context['routes'] = self.gym.routes.order_by("-created").select_related('setter')[:5]
+        context['open_flags'] = self.gym.open_flag_count()
         return context
 
-class GymStats(JSONResponseMixin, GymFinderMixin, DetailView):
+class GymStats(ReplicaReadMixin, JSONResponseMixin, GymFinderMixin, DetailView):
 
     perms = "admin_view"
 
@@ -311,6 +636,10 @@ class GymStats(JSONResponseMixin, GymFinderMixin, DetailView):
         return [dict(label=k, data=v) for k,v in d.items()]
 
     def get_context_data(self, **kwargs):
+        key = "gym_stats:%s:%s" % (self.gym.id, self.gym.routes_version())
+        return cache.get_or_set(key, self.build_stats, 600)
+
+    def build_stats(self):
         context = {}
         d = {}
         for k,v in self.gym.grades(type="top_rope").items():
@@ -325,6 +654,52 @@ class GymStats(JSONResponseMixin, GymFinderMixin, DetailView):
         context['locations'] = self.split(self.gym.locations())
         return context
 
+class GymGradeTrends(ReplicaReadMixin, JSONResponseMixin, GymFinderMixin, View):
+    """
+    Live route counts per grade over time, read from the nightly GradeSnapshot rows.
+    """
+
+    perms = "admin_view"
+
+    def get(self, request, *args, **kwargs):
+        end = parse_date(request.GET.get("end"), datetime.date.today())
+        start = parse_date(request.GET.get("start"), end - datetime.timedelta(days=365))
+        type = request.GET.get("type", "bouldering")
+        snapshots = self.gym.grade_snapshots.filter(date__gte=start, date__lte=end, type=type)
+        if request.GET.get("location"):
+            snapshots = snapshots.filter(location=request.GET["location"])
+        labels = {}
+        series = OrderedDict()
+        for row in snapshots.values('date', 'grade').annotate(count=Sum('count')).order_by('grade', 'date'):
+            if row['grade'] not in labels:
+                labels[row['grade']] = Route(gym=self.gym, grade=row['grade'], type=type).get_grade_display()
+            day = datetime.datetime.combine(row['date'], datetime.time())
+            timestamp = int(time.mktime(day.timetuple())) * 1000
+            counts = series.setdefault(labels[row['grade']], OrderedDict())
+            counts[timestamp] = counts.get(timestamp, 0) + row['count']
+        return self.render_to_response([dict(label=k, data=v.items()) for k,v in series.items()])
+
+class SetterReport(ReplicaReadMixin, GymFinderMixin, TemplateView, JSONResponseMixin):
+
+    perms = "admin_view"
+    template_name = "gym_setter_report.html"
+
+    def get_context_data(self, **kwargs):
+        context = super(SetterReport, self).get_context_data(**kwargs)
+        end = parse_date(self.request.GET.get("end"), datetime.date.today())
+        start = parse_date(self.request.GET.get("start"), end - datetime.timedelta(weeks=12))
+        key = "setter_report:%s:%s:%s:%s" % (self.gym.id, self.gym.routes_version(), start, end)
+        context['report'] = cache.get_or_set(key, lambda: self.gym.setter_report(start, end), 600)
+        context['start'] = start
+        context['end'] = end
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get("format") != "json":
+            return super(SetterReport, self).render_to_response(context, **response_kwargs)
+        return self.render_to_json_response(dict(start=context['start'].isoformat(),
+            end=context['end'].isoformat(), setters=context['report']))
+
 class AdminRouteAdd(GymFinderMixin, CreateView):
 
     model = Route
@@ -351,6 +726,49 @@ class AdminRouteAdd(GymFinderMixin, CreateView):
         else:
             return urlresolvers.reverse("gym_routes_admin", kwargs=dict(gym=self.kwargs['gym']))
 
+class AdminRouteBulkAdd(GymFinderMixin, FormView):
+    """
+    Adds a whole setting session's routes in one submission.
+    """
+
+    perms = "routes_manage"
+    template_name = "gyms/route_bulk_form.html"
+    form_class = BulkRouteFormSet
+
+    def get_rows(self):
+        rows = self.request.GET.get("rows", "")
+        return min(int(rows), 100) if rows.isdigit() else 10
+
+    def get_form_kwargs(self):
+        kwargs = super(AdminRouteBulkAdd, self).get_form_kwargs()
+        kwargs['gym'] = self.gym
+        kwargs['user'] = self.request.user
+        kwargs['rows'] = self.get_rows()
+        return kwargs
+
+    def get_context_data(self, **kwargs):
+        context = super(AdminRouteBulkAdd, self).get_context_data(**kwargs)
+        context['reset_form'] = getattr(self, 'reset_form', None) or ResetLocationForm(self.gym)
+        return context
+
+    def post(self, request, *args, **kwargs):
+        form = self.get_form(self.get_form_class())
+        self.reset_form = ResetLocationForm(self.gym, request.POST)
+        if form.is_valid() and self.reset_form.is_valid():
+            return self.form_valid(form)
+        return self.form_invalid(form)
+
+    def form_valid(self, form):
+        location = self.reset_form.cleaned_data['location']
+        if location:
+            routes = form.routes()
+            torn = self.gym.reset_location(location, routes)
+            messages.success(self.request, "%s reset: %s routes torn, %s added" % (location, torn, len(routes)))
+        else:
+            routes = Route.bulk_add(form.routes())
+            messages.success(self.request, "%s routes added" % len(routes))
+        return shortcuts.redirect("gym_routes_admin", gym=self.gym.slug)
+
 class AdminRouteEdit(RouteFinderMixin, UpdateView):
 
     perms = "routes_manage"
@@ -465,7 +883,7 @@ def login(request, gym, template_name='registration/login.html',
     Displays the login form and handles the login action.
     """
 
-    gym = get_object_or_404(Gym, slug=gym)
+    gym = get_gym_or_404(gym)
     redirect_to = request.POST.get(redirect_field_name,
                                    request.GET.get(redirect_field_name, ''))
 
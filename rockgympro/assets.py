@@ -0,0 +1,72 @@
+import os
+import posixpath
+import re
+
+import rcssmin
+import rjsmin
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)(.*?)\1\s*\)""")
+ABSOLUTE_PREFIXES = ('#', '/', 'data:', 'http:', 'https:')
+
+def rebase_css_urls(content, source, bundle):
+    """
+    Rewrites relative url() references in a stylesheet so they still resolve
+    once its contents are moved from source to bundle.
+    """
+    source_dir = posixpath.dirname(source)
+    bundle_dir = posixpath.dirname(bundle)
+
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(ABSOLUTE_PREFIXES):
+            return match.group(0)
+        path = posixpath.normpath(posixpath.join(source_dir, url))
+        return "url(%s%s%s)" % (quote, posixpath.relpath(path, bundle_dir or '.'), quote)
+    return CSS_URL.sub(rebase, content)
+
+def read_source(path):
+    found = finders.find(path)
+    if not found:
+        raise ValueError("Static file %r in a bundle could not be found." % path)
+    with open(found, 'rb') as f:
+        content = f.read()
+    try:
+        return content.decode('utf8')
+    except UnicodeDecodeError:
+        # A few vendor plugins are saved as latin-1.
+        return content.decode('latin-1')
+
+def render_bundle(name, sources):
+    """
+    Returns the minified contents of the bundle name built from sources.
+    """
+    parts = []
+    for path in sources:
+        content = read_source(path)
+        if name.endswith('.css'):
+            parts.append(rcssmin.cssmin(rebase_css_urls(content, path, name)))
+        else:
+            # Terminate each file so one missing a trailing semicolon can't
+            # run into the next.
+            parts.append(rjsmin.jsmin(content) + ';')
+    return '\n'.join(parts)
+
+def build_bundles(root=None):
+    """
+    Writes every bundle in STATIC_BUNDLES under root and returns
+    (name, source bytes, bundle bytes) for each.
+    """
+    root = root or settings.STATIC_BUNDLE_ROOT
+    results = []
+    for name, sources in sorted(settings.STATIC_BUNDLES.items()):
+        content = render_bundle(name, sources).encode('utf8')
+        path = os.path.join(root, *name.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(content)
+        size = sum(os.path.getsize(finders.find(source)) for source in sources)
+        results.append((name, size, len(content)))
+    return results
@@ -0,0 +1,215 @@
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+class LocalLRU(object):
+    """
+    A bounded, per-process LRU of (value, expires_at) pairs.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        now = now or time.time()
+        with self._lock:
+            try:
+                value, expires = self._data.pop(key)
+            except KeyError:
+                return None
+            if expires <= now:
+                return None
+            self._data[key] = (value, expires)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, time.time() + timeout)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class SharedCounters(object):
+    """
+    Per-process counters whose increments are added to totals in a shared
+    Django cache at most every flush_interval seconds, so the counts from
+    every worker can be read from any process.
+    """
+
+    def __init__(self, prefix, names, alias='default', flush_interval=10):
+        self.prefix = prefix
+        self.names = names
+        self.alias = alias
+        self.flush_interval = flush_interval
+        self.local = dict.fromkeys(names, 0)
+        self._pending = dict.fromkeys(names, 0)
+        self._flushed = time.time()
+        self._lock = threading.Lock()
+
+    def key(self, name):
+        return "stats:%s:%s" % (self.prefix, name)
+
+    def count(self, name):
+        with self._lock:
+            self.local[name] += 1
+            self._pending[name] += 1
+        if time.time() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, dict.fromkeys(self.names, 0)
+            self._flushed = time.time()
+        shared = caches[self.alias]
+        for name, value in pending.items():
+            if value:
+                try:
+                    shared.incr(self.key(name), value)
+                except ValueError:
+                    shared.set(self.key(name), value, None)
+
+    def totals(self):
+        shared = caches[self.alias]
+        return dict((name, shared.get(self.key(name)) or 0) for name in self.names)
+
+    def reset(self):
+        caches[self.alias].delete_many([self.key(name) for name in self.names])
+
+class TieredCache(object):
+    """
+    Two-level cache: a per-process LocalLRU in front of a shared Django cache.
+
+    Values in the shared cache are stored alongside their expiry and the time
+    they took to compute, so get_or_set can refresh them probabilistically
+    before they expire (XFetch). On a real miss only the worker holding the
+    shared lock recomputes; the others wait briefly for its result.
+    """
+
+    def __init__(self, alias='default', max_entries=1000, local_timeout=5,
+                 beta=1.0, lock_timeout=10, lock_wait=2.0):
+        self.alias = alias
+        self.local = LocalLRU(max_entries)
+        self.local_timeout = local_timeout
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self.counters = SharedCounters("tiered_cache",
+            ('local_hits', 'shared_hits', 'misses', 'early_refreshes', 'lock_waits'), alias)
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def count(self, name):
+        self.counters.count(name)
+
+    def stats(self):
+        """
+        This process's counters.
+        """
+        stats = dict(self.counters.local)
+        stats['local_entries'] = len(self.local)
+        return stats
+
+    def shared_stats(self):
+        """
+        Counters summed across every worker, as of their last flush.
+        """
+        stats = self.counters.totals()
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['local_hits'] + stats['shared_hits']) * 1.0 / lookups, 3) if lookups else None
+        return stats
+
+    def _get_entry(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            self.count('local_hits')
+            return entry
+        entry = self.shared.get(key)
+        if entry is not None:
+            self.count('shared_hits')
+            self.local.set(key, entry, min(self.local_timeout, max(entry[1] - time.time(), 0)))
+        return entry
+
+    def _set_entry(self, key, value, timeout, delta):
+        entry = (value, time.time() + timeout, delta)
+        self.shared.set(key, entry, timeout)
+        self.local.set(key, entry, min(self.local_timeout, timeout))
+
+    def get(self, key, default=None):
+        entry = self._get_entry(key)
+        if entry is None:
+            self.count('misses')
+            return default
+        return entry[0]
+
+    def set(self, key, value, timeout=300):
+        self._set_entry(key, value, timeout, 0)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def _should_refresh(self, entry):
+        value, expires, delta = entry
+        return time.time() - delta * self.beta * math.log(1.0 - random.random()) >= expires
+
+    def _compute(self, key, func, timeout):
+        start = time.time()
+        value = func()
+        self._set_entry(key, value, timeout, time.time() - start)
+        return value
+
+    def get_or_set(self, key, func, timeout=300):
+        """
+        Returns the cached value for key, calling func to compute it on a miss.
+        """
+        entry = self._get_entry(key)
+        if entry is not None:
+            if not self._should_refresh(entry):
+                return entry[0]
+            self.count('early_refreshes')
+            return self._compute(key, func, timeout)
+        self.count('misses')
+        lock_key = "%s:lock" % key
+        if self.shared.add(lock_key, 1, self.lock_timeout):
+            try:
+                return self._compute(key, func, timeout)
+            finally:
+                self.shared.delete(lock_key)
+        self.count('lock_waits')
+        deadline = time.time() + self.lock_wait
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = self.shared.get(key)
+            if entry is not None:
+                return entry[0]
+        return self._compute(key, func, timeout)
+
+def build_cache():
+    options = getattr(settings, 'TIERED_CACHE', {})
+    return TieredCache(
+        alias=options.get('ALIAS', 'default'),
+        max_entries=options.get('MAX_ENTRIES', 1000),
+        local_timeout=options.get('LOCAL_TIMEOUT', 5),
+    )
+
+cache = build_cache()
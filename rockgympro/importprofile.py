@@ -0,0 +1,49 @@
+"""
+Imports the WSGI application with every import timed, and prints the
+results as JSON. Run in a fresh interpreter so nothing is already imported:
+
+    python -m rockgympro.importprofile [--urls]
+
+--urls also loads ROOT_URLCONF, which Django otherwise does on the first request.
+"""
+import json
+import sys
+import time
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+_import = builtins.__import__
+timings = {}
+_children = []
+
+def timed_import(name, *args, **kwargs):
+    start = time.time()
+    _children.append(0.0)
+    try:
+        return _import(name, *args, **kwargs)
+    finally:
+        elapsed = time.time() - start
+        children = _children.pop()
+        if _children:
+            _children[-1] += elapsed
+        entry = timings.setdefault(name, [0.0, 0.0])
+        entry[0] += elapsed
+        entry[1] += elapsed - children
+
+def profile(urls=False):
+    start = time.time()
+    builtins.__import__ = timed_import
+    try:
+        import rockgympro.wsgi
+        if urls:
+            from django.core.urlresolvers import get_resolver
+            get_resolver(None).url_patterns
+    finally:
+        builtins.__import__ = _import
+    return dict(total=time.time() - start, modules=timings)
+
+if __name__ == "__main__":
+    sys.stdout.write(json.dumps(profile(urls="--urls" in sys.argv)))
@@ -0,0 +1,85 @@
+import json
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.http import HttpResponse
+
+from rockgympro.cache import cache
+
+REJECTED_KEY = "ratelimit:rejected:%s"
+
+def policy(endpoint):
+    """
+    Returns (requests, seconds) for endpoint from RATE_LIMITS, falling back to
+    its "default" entry, or None if the endpoint is unlimited.
+    """
+    limits = getattr(settings, 'RATE_LIMITS', {})
+    return limits.get(endpoint, limits.get('default'))
+
+def take_token(key, requests, seconds, now=None):
+    """
+    Token bucket holding up to requests tokens and refilling at
+    requests/seconds per second. Takes a token and returns 0 if one is
+    available, or returns the seconds until the next one otherwise.
+
+    The bucket lives in the shared cache so every worker draws from it. Reads
+    and writes aren't atomic, so concurrent requests can occasionally both
+    take the last token.
+    """
+    now = now or time.time()
+    rate = float(requests) / seconds
+    tokens, stamp = cache.shared.get(key) or (requests, now)
+    tokens = min(requests, tokens + (now - stamp) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    cache.shared.set(key, (tokens - 1, now), int(math.ceil(seconds)) + 1)
+    return 0
+
+def count_rejection(endpoint):
+    key = REJECTED_KEY % endpoint
+    try:
+        cache.shared.incr(key)
+    except ValueError:
+        cache.shared.set(key, 1, None)
+
+def rejections(endpoints):
+    """
+    Rejected call counts for endpoints, summed across workers.
+    """
+    return dict((endpoint, cache.shared.get(REJECTED_KEY % endpoint) or 0) for endpoint in endpoints)
+
+def client_id(request):
+    # Read the user id from the session so the user row is never loaded.
+    user_id = request.session.get(SESSION_KEY)
+    if user_id:
+        return "user:%s" % user_id
+    return "ip:%s" % request.META.get('REMOTE_ADDR', '')
+
+class RateLimitMixin(object):
+    """
+    Rejects POSTs over the RATE_LIMITS policy for "<rate_limit_scope>:<action>"
+    with a 429, before the view resolves anything from the database.
+    List it before the view's other mixins.
+    """
+    rate_limit_scope = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method == "POST":
+            endpoint = "%s:%s" % (self.rate_limit_scope, kwargs.get('action'))
+            limit = policy(endpoint)
+            if limit is not None:
+                key = "ratelimit:%s:%s" % (endpoint, client_id(request))
+                wait = take_token(key, *limit)
+                if wait:
+                    count_rejection(endpoint)
+                    return self.rate_limited(wait)
+        return super(RateLimitMixin, self).dispatch(request, *args, **kwargs)
+
+    def rate_limited(self, wait):
+        response = HttpResponse(json.dumps(dict(success=False, error="rate_limited")),
+            content_type='application/json', status=429)
+        response.reason_phrase = "TOO MANY REQUESTS"
+        response['Retry-After'] = str(int(math.ceil(wait)))
+        return response
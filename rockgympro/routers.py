@@ -0,0 +1,74 @@
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+
+_state = threading.local()
+
+PIN_COOKIE = "primary_pin"
+
+SAFE_METHODS = ("GET", "HEAD")
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", ())
+
+def is_pinned(request):
+    """
+    True while the client is inside its read-your-writes window after a write.
+    """
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+class ReplicaRouter(object):
+    """
+    Sends reads to the replica picked for the view wrapped by
+    read_from_replica while it is running, and everything else to the
+    primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, "replica", None) or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, model):
+        return True
+
+def read_from_replica(view):
+    """
+    Runs a view with its reads routed to one randomly picked replica, unless
+    the request writes or the client has written recently. A wrapped view
+    called from another keeps the outer view's replica, so a page never mixes
+    rows from replicas with different lag.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or is_pinned(request):
+            return view(request, *args, **kwargs)
+        previous = getattr(_state, "replica", None)
+        if previous is None and replicas():
+            _state.replica = random.choice(replicas())
+        try:
+            response = view(request, *args, **kwargs)
+            # Template responses evaluate their querysets when rendered.
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            return response
+        finally:
+            _state.replica = previous
+    return wrapped
+
+class ReplicaReadMixin(object):
+
+    def dispatch(self, request, *args, **kwargs):
+        dispatch = super(ReplicaReadMixin, self).dispatch
+        return read_from_replica(dispatch)(request, *args, **kwargs)
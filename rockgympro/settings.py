@@ -70,6 +70,8 @@ ACCOUNT_ADAPTER = "gyms.adapter.GymAccountAdapter"
 ACCOUNT_LOGOUT_ON_GET = True
 
 MIDDLEWARE_CLASSES = (
+    'gyms.middleware.RequestTimingMiddleware',
+    'gyms.middleware.CompressionMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,7 +79,8 @@ MIDDLEWARE_CLASSES = (
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'gyms.middleware.HttpsRedirectMiddleware'
+    'gyms.middleware.HttpsRedirectMiddleware',
+    'gyms.middleware.PrimaryPinMiddleware',
 )
 
 AUTHENTICATION_BACKENDS = (
@@ -121,6 +124,50 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['rockgympro.routers.ReplicaRouter']
+
+# Aliases in DATABASES that read-heavy views may read from.
+DATABASE_REPLICAS = ()
+
+# Seconds a client keeps reading from the primary after it writes.
+REPLICA_PIN_SECONDS = 10
+
+# Per-process level of rockgympro.cache, in front of CACHES[ALIAS].
+TIERED_CACHE = {
+    'ALIAS': 'default',
+    'MAX_ENTRIES': 1000,
+    'LOCAL_TIMEOUT': 5,
+}
+
+# Torn routes older than this are moved to the archive tables by archive_routes.
+ROUTE_ARCHIVE_AFTER_DAYS = 365
+
+# Longest a gym_changes request may be held open waiting for a change, in seconds.
+ROUTE_CHANGES_MAX_WAIT = 25
+
+# Route changes older than this are deleted by trim_route_changes.
+ROUTE_CHANGES_KEEP_DAYS = 7
+
+# publish_boards writes static copies of each gym's board under this prefix in
+# DEFAULT_FILE_STORAGE. Pages are rendered as if requested from this host.
+BOARD_SNAPSHOT_ROOT = 'boards'
+BOARD_SNAPSHOT_HOST = 'dynoroute.com'
+
+# Token-bucket limits for write AJAX endpoints, as (requests, seconds) per
+# user, or per IP address for anonymous clients. Keys are "<scope>:<action>";
+# "default" covers endpoints not listed.
+RATE_LIMITS = {
+    'default': (30, 60),
+    'route:send': (30, 60),
+    'route:unsend': (30, 60),
+    'route:favorite': (30, 60),
+    'route:unfavorite': (30, 60),
+    'route:rate': (20, 60),
+    'route:flag': (5, 300),
+    'gym:follow': (10, 60),
+    'gym:unfollow': (10, 60),
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.6/topics/i18n/
 
@@ -144,4 +191,63 @@ STATICFILES_DIRS = (
     os.path.join(BASE_DIR, 'vendor/static'),
 )
 
+# Concatenated, minified bundles written into vendor/static by
+# `manage.py build_static_bundles` before collectstatic. Templates include
+# them with {% static_bundle %}, which falls back to the source files while
+# STATIC_BUNDLES_ENABLED is off.
+STATIC_BUNDLE_ROOT = os.path.join(BASE_DIR, 'vendor/static')
+
+STATIC_BUNDLES = {
+    'bundles/theme.css': (
+        'css/font-awesome.css',
+        'css/bootstrap.min.css',
+        'js/plugins/simplecolorpicker/jquery.simplecolorpicker.css',
+        'css/App.css',
+    ),
+    'bundles/plugins.css': (
+        'css/custom.css',
+        'js/plugins/magnific/magnific-popup.css',
+        'js/plugins/datepicker/datepicker.css',
+        'js/plugins/fileupload/bootstrap-fileupload.css',
+        'js/libs/css/ui-lightness/jquery-ui-1.9.2.custom.css',
+        'js/plugins/icheck/skins/minimal/blue.css',
+        'js/plugins/select2/select2.css',
+        'js/plugins/fullcalendar/fullcalendar.css',
+    ),
+    'bundles/libs.js': (
+        'js/libs/jquery-1.9.1.min.js',
+        'js/libs/jquery-ui-1.9.2.custom.min.js',
+    ),
+    'bundles/plugins.js': (
+        'js/libs/bootstrap.min.js',
+        'js/plugins/magnific/jquery.magnific-popup.min.js',
+        'js/plugins/icheck/jquery.icheck.min.js',
+        'js/plugins/datepicker/bootstrap-datepicker.js',
+        'js/plugins/simplecolorpicker/jquery.simplecolorpicker.js',
+        'js/plugins/select2/select2.js',
+        'js/plugins/tableCheckable/jquery.tableCheckable.js',
+        'js/plugins/fileupload/bootstrap-fileupload.js',
+        'js/plugins/howl/howl.js',
+    ),
+    'bundles/app.js': (
+        'js/plugins/flot/jquery.flot.js',
+        'js/plugins/flot/jquery.flot.orderBars.js',
+        'js/plugins/flot/jquery.flot.pie.js',
+        'js/plugins/flot/jquery.flot.stack.js',
+        'js/plugins/flot/jquery.flot.tooltip.min.js',
+        'js/plugins/flot/jquery.flot.resize.js',
+        'js/plugins/raty/jquery.raty.js',
+        'js/App.js',
+        'js/script.js',
+        'js/libs/raphael-2.1.2.min.js',
+        'js/plugins/morris/morris.min.js',
+        'js/demos/charts/morris/area.js',
+        'js/plugins/sparkline/jquery.sparkline.min.js',
+        'js/plugins/fullcalendar/fullcalendar.min.js',
+        'js/demos/calendar.js',
+    ),
+}
+
+STATIC_BUNDLES_ENABLED = False
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -12,12 +12,18 @@ DATABASES = {
     },
 }
 
-'''CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
-        'LOCATION': os.environ['CACHE_URL'],
+for i, host in enumerate(os.environ.get("RDS_REPLICA_HOSTNAMES", "").split()):
+    alias = "replica%s" % i
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS += (alias,)
+
+if 'CACHE_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ['CACHE_URL'],
+        }
     }
-}'''
 
 DEFAULT_FROM_EMAIL = "noreply@dynoroute.com"
 ACCOUNT_DEFAULT_HTTP_PROTOCOL ="https"
@@ -42,7 +48,7 @@ INSTALLED_APPS += ('storages',)
 #SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 
 DEFAULT_FILE_STORAGE = 'storages.backends.s3botomulti.S3BotoStorage_media'
-STATICFILES_STORAGE = 'storages.backends.s3botomulti.S3BotoStorage_static'
+STATICFILES_STORAGE = 'rockgympro.storage.S3ManifestStaticStorage'
 EMAIL_BACKEND = 'django_ses.SESBackend'
 THUMBNAIL_DEFAULT_STORAGE = 'storages.backends.s3botomulti.S3BotoStorage_media'
 
@@ -65,6 +71,7 @@ STORAGES_S3BOTO_MULTI = {
         #'AWS_S3_SECURE_URLS' : False,
         #'AWS_S3_CUSTOM_DOMAIN' : "static.dynoroute.com",
         'AWS_QUERYSTRING_AUTH' : False,
+        # Cache-Control and gzip encoding are set per file by S3ManifestStaticStorage.
     }
 }
 
@@ -76,6 +83,16 @@ AWS_SES_REGION_ENDPOINT = 'email.us-east-1.amazonaws.com'
 DEBUG = (os.environ.get("DEBUG", "FALSE") == "TRUE")
 TEMPLATE_DEBUG = DEBUG
 THUMBNAIL_DEBUG = DEBUG
+STATIC_BUNDLES_ENABLED = not DEBUG
+
+if not DEBUG:
+    # Compile each template once per process instead of on every render.
+    TEMPLATE_LOADERS = (
+        ('django.template.loaders.cached.Loader', (
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        )),
+    )
 
 for host in os.environ.get("ALLOWED_HOSTS", "").split():
     ALLOWED_HOSTS += [host]
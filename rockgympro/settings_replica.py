@@ -0,0 +1,10 @@
+import os
+from rockgympro.settings import *
+
+# Local stand-in for a primary/replica pair, used to exercise ReplicaRouter.
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+}
+
+DATABASE_REPLICAS = ('replica',)
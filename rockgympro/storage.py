@@ -0,0 +1,66 @@
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from storages.backends.s3botomulti import S3BotoStorage_static
+
+GZIP_CONTENT_TYPES = (
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'application/x-javascript',
+    'application/json',
+    'image/svg+xml',
+    'text/plain',
+    'text/xml',
+    'application/vnd.ms-fontobject',
+    'application/x-font-ttf',
+)
+
+# Hashed names never change in place; everything else may be replaced by the next deploy.
+HASHED_CACHE_CONTROL = 'public, max-age=31536000'
+UNHASHED_CACHE_CONTROL = 'public, max-age=300'
+
+class LenientManifestMixin(object):
+    """
+    Leaves references that point at files missing from the theme as they are
+    instead of failing the whole collectstatic run.
+    """
+
+    def url_converter(self, name, template=None):
+        converter = super(LenientManifestMixin, self).url_converter(name, template)
+
+        def convert(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                return matchobj.group(0)
+        return convert
+
+class S3ManifestStaticStorage(LenientManifestMixin, ManifestFilesMixin, S3BotoStorage_static):
+    """
+    Hashed static files on S3. Text assets are stored gzip-encoded with a
+    Content-Encoding header, since S3 can't negotiate encodings itself. Only
+    the hashed copies written by post_process get the one-year Cache-Control;
+    the originals and the manifest get a short one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(S3ManifestStaticStorage, self).__init__(*args, **kwargs)
+        self.gzip = True
+        self.gzip_content_types = GZIP_CONTENT_TYPES
+        self._hashing = False
+
+    def post_process(self, *args, **kwargs):
+        self._hashing = True
+        try:
+            for result in super(S3ManifestStaticStorage, self).post_process(*args, **kwargs):
+                yield result
+        finally:
+            self._hashing = False
+
+    def _save(self, name, content):
+        hashed = self._hashing and name != self.manifest_name
+        headers = self.headers
+        self.headers = dict(headers, **{'Cache-Control': HASHED_CACHE_CONTROL if hashed else UNHASHED_CACHE_CONTROL})
+        try:
+            return super(S3ManifestStaticStorage, self)._save(name, content)
+        finally:
+            self.headers = headers
@@ -120,9 +120,41 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    # Fields that show up in a gym's cached setter choices (see RouteForm).
+    SETTER_FIELDS = ('gym_id', 'level', 'name', 'username')
+
     class Meta:
         unique_together = (("username", "gym"),)
 
+    def __init__(self, *args, **kwargs):
+        super(User, self).__init__(*args, **kwargs)
+        self._saved_setter = self.setter_state() if self.pk else None
+
+    def setter_state(self):
+        return tuple(getattr(self, field) for field in self.SETTER_FIELDS)
+
+    def touch_gyms(self, *gym_ids):
+        """
+        Bumps Gym.edited so forms cached against it are rebuilt.
+        """
+        gym_ids = [gym_id for gym_id in gym_ids if gym_id]
+        if gym_ids:
+            Gym = self._meta.get_field('gym').rel.to
+            Gym.objects.filter(pk__in=gym_ids).update(edited=timezone.now())
+            from gyms.lookup import gym_cache
+            gym_cache.changed()
+
+    def save(self, *args, **kwargs):
+        super(User, self).save(*args, **kwargs)
+        if self.setter_state() != self._saved_setter:
+            self.touch_gyms(self._saved_setter and self._saved_setter[0], self.gym_id)
+        self._saved_setter = self.setter_state()
+
+    def delete(self, *args, **kwargs):
+        gym_id = self.gym_id
+        super(User, self).delete(*args, **kwargs)
+        self.touch_gyms(gym_id)
+
     @property
     def perms(self):
         for k,v in levels.items():
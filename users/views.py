@@ -9,6 +9,17 @@ from django.views.generic.edit import UpdateView
 from django.core.urlresolvers import reverse
 from users.models import User
 from django.utils.decorators import method_decorator
+from gyms.feeds import user_feed
+from itertools import chain
+from operator import attrgetter
+
+def logbook(live, archived, limit):
+    """
+    Latest entries across a user's live and archived sends or favorites.
+    """
+    entries = chain(live.order_by("-created").select_related("route", "route__gym", "route__setter")[:limit],
+        archived.order_by("-created").select_related("route", "route__gym", "route__setter")[:limit])
+    return sorted(entries, key=attrgetter("created"), reverse=True)[:limit]
 
 def landing(request):
     if request.user.is_authenticated():
@@ -27,8 +38,10 @@ def dashboard(request):
     if request.user.gym is not None:
         return redirect("gym_dashboard", gym=request.user.gym.slug)
     context = {
-        "favorites":request.user.favorite_set.order_by("-created")[:10],
-        "sends":request.user.send_set.order_by("-created")[:10],
+        "favorites":logbook(request.user.favorite_set, request.user.archived_favorites, 10),
+        "sends":logbook(request.user.send_set, request.user.archived_sends, 10),
+        "feed":user_feed(request.user, 10),
+        "recommended":request.user.recommended_routes.order_by("rank").select_related("route", "route__gym", "route__setter")[:10],
         "logout_next":reverse("home"),
     }
     return render(request, "user_dashboard.html", context)
@@ -38,7 +51,7 @@ def favorites(request):
     if request.user.gym is not None:
         return redirect("gym_dashboard", gym=request.user.gym.slug)
     context = {
-        "routes":request.user.favorite_set.order_by("-created")[:10],
+        "routes":logbook(request.user.favorite_set, request.user.archived_favorites, 10),
         "title":"Favorite Routes",
         "logout_next":reverse("home"),
     }
@@ -49,7 +62,7 @@ def sends(request):
     if request.user.gym is not None:
         return redirect("gym_dashboard", gym=request.user.gym.slug)
     context = {
-        "routes":request.user.send_set.order_by("-created")[:10],
+        "routes":logbook(request.user.send_set, request.user.archived_sends, 10),
         "title":"Sent Routes",
         "logout_next":reverse("home"),
     }